@@ -6,18 +6,15 @@
 -- Функция 1: can_use_free_trial
 CREATE OR REPLACE FUNCTION public.can_use_free_trial(p_user_id UUID)
 RETURNS BOOLEAN
-LANGUAGE plpgsql
+LANGUAGE sql
+STABLE
 SECURITY DEFINER
 AS $$
-DECLARE
-    v_today_count INTEGER;
-BEGIN
-    SELECT COALESCE(analysis_count, 0) INTO v_today_count
-    FROM public.daily_free_analyses
-    WHERE user_id = p_user_id AND analysis_date = CURRENT_DATE;
-    
-    RETURN (v_today_count < 1);
-END;
+    SELECT COALESCE((
+        SELECT analysis_count
+        FROM public.daily_free_analyses
+        WHERE user_id = p_user_id AND analysis_date = CURRENT_DATE
+    ), 0) < 1;
 $$;
 
 -- Функция 2: record_free_trial_usage
@@ -26,12 +23,12 @@ CREATE OR REPLACE FUNCTION public.record_free_trial_usage(
     p_profile_analyzed TEXT DEFAULT NULL
 )
 RETURNS VOID
-LANGUAGE plpgsql
+LANGUAGE sql
+VOLATILE
 SECURITY DEFINER
 AS $$
-BEGIN
     INSERT INTO public.daily_free_analyses (
-        user_id, analysis_date, analysis_count, 
+        user_id, analysis_date, analysis_count,
         last_analysis_timestamp, profile_analyzed
     ) VALUES (
         p_user_id, CURRENT_DATE, 1, NOW(), p_profile_analyzed
@@ -41,7 +38,6 @@ BEGIN
         analysis_count = daily_free_analyses.analysis_count + 1,
         last_analysis_timestamp = NOW(),
         profile_analyzed = COALESCE(EXCLUDED.profile_analyzed, daily_free_analyses.profile_analyzed);
-END;
 $$;
 
 -- Функция 3: get_free_trial_info
@@ -52,32 +48,43 @@ RETURNS TABLE (
     last_used TIMESTAMPTZ,
     total_free_analyses INTEGER
 )
-LANGUAGE plpgsql
+LANGUAGE sql
+STABLE
 SECURITY DEFINER
 AS $$
-BEGIN
-    RETURN QUERY
-    SELECT 
-        public.can_use_free_trial(p_user_id) as can_use_today,
-        COALESCE(today_data.analysis_count, 0)::INTEGER as today_count,
-        today_data.last_analysis_timestamp as last_used,
-        COALESCE(total_data.total, 0)::INTEGER as total_free_analyses
-    FROM (SELECT 1) as dummy
-    LEFT JOIN (
-        SELECT analysis_count, last_analysis_timestamp
-        FROM public.daily_free_analyses
-        WHERE user_id = p_user_id AND analysis_date = CURRENT_DATE
-    ) today_data ON TRUE
-    LEFT JOIN (
-        SELECT SUM(analysis_count)::INTEGER as total
-        FROM public.daily_free_analyses
-        WHERE user_id = p_user_id
-    ) total_data ON TRUE;
-END;
+    -- Один проход по строкам пользователя: использование за сегодня и общий
+    -- итог считаются через FILTER-агрегаты вместо отдельных подзапросов
+    SELECT
+        (COALESCE(SUM(analysis_count) FILTER (WHERE analysis_date = CURRENT_DATE), 0) < 1) as can_use_today,
+        COALESCE(SUM(analysis_count) FILTER (WHERE analysis_date = CURRENT_DATE), 0)::INTEGER as today_count,
+        MAX(last_analysis_timestamp) FILTER (WHERE analysis_date = CURRENT_DATE) as last_used,
+        COALESCE(SUM(analysis_count), 0)::INTEGER as total_free_analyses
+    FROM public.daily_free_analyses
+    WHERE user_id = p_user_id;
+$$;
+
+-- Функция 4: get_access_status
+-- Подписка + бесплатный анализ за один вызов (используется check_user_can_analyze)
+CREATE OR REPLACE FUNCTION public.get_access_status(p_user_id UUID)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+    SELECT jsonb_build_object(
+        'has_subscription', COALESCE((
+            SELECT lower(stripe_subscription_status) IN ('active', 'trialing')
+            FROM public.profiles
+            WHERE id = p_user_id
+        ), FALSE),
+        'can_use_today', trial.can_use_today,
+        'trial_info', to_jsonb(trial)
+    )
+    FROM public.get_free_trial_info(p_user_id) AS trial;
 $$;
 
 -- Комментарии
 COMMENT ON FUNCTION public.can_use_free_trial IS 'Check if user can use free trial today';
 COMMENT ON FUNCTION public.record_free_trial_usage IS 'Record free trial usage';
 COMMENT ON FUNCTION public.get_free_trial_info IS 'Get user free trial info';
-
+COMMENT ON FUNCTION public.get_access_status IS 'Get user subscription and free trial access status';
@@ -27,9 +27,12 @@ CREATE TABLE IF NOT EXISTS public.daily_free_analyses (
 );
 
 -- Индексы
-CREATE INDEX IF NOT EXISTS idx_scan_history_user_id ON public.scan_history(user_id);
-CREATE INDEX IF NOT EXISTS idx_scan_history_created_at ON public.scan_history(created_at DESC);
-CREATE INDEX IF NOT EXISTS idx_daily_free_analyses_user_id ON public.daily_free_analyses(user_id);
+-- История читается по пользователю от новых к старым: один составной индекс
+-- покрывает и фильтр, и сортировку. Поиск по user_id в daily_free_analyses
+-- обслуживает индекс ограничения unique_user_date.
+DROP INDEX IF EXISTS public.idx_scan_history_user_id, public.idx_scan_history_created_at;
+DROP INDEX IF EXISTS public.idx_daily_free_analyses_user_id;
+CREATE INDEX IF NOT EXISTS idx_scan_history_user_date ON public.scan_history(user_id, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_daily_free_analyses_date ON public.daily_free_analyses(analysis_date DESC);
 
 -- Включаем RLS
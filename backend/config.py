@@ -105,6 +105,9 @@ class Settings(BaseSettings):
     perplexity_model: str = "sonar"  # Updated to working model name
     perplexity_temperature: float = 0.2
     perplexity_max_tokens: int = 300
+    # Replay niche analyses for identical prompts from Redis (off by default)
+    perplexity_response_cache: bool = Field(
+        default=False, env="PERPLEXITY_RESPONSE_CACHE")
 
     # Conditionally load .env file only if it exists (not in Vercel serverless)
     _env_file_path = os.path.join(os.path.dirname(__file__), ".env")
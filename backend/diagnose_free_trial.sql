@@ -15,19 +15,13 @@ SELECT
         ELSE '❌ NO - НУЖНО ВЫПОЛНИТЬ МИГРАЦИЮ!'
     END as result;
 
--- 2. Проверка записей в таблице
+-- 2-3. Проверка записей в таблице (всего и за сегодня) за один проход
 SELECT 
     'Records in daily_free_analyses' as check_name,
-    CONCAT('Found: ', COUNT(*), ' records') as result
+    CONCAT('Found: ', COUNT(*), ' records, ',
+           COUNT(*) FILTER (WHERE analysis_date = CURRENT_DATE), ' for today') as result
 FROM public.daily_free_analyses;
 
--- 3. Проверка записей за сегодня
-SELECT 
-    'Today records' as check_name,
-    CONCAT('Found: ', COUNT(*), ' records for today') as result
-FROM public.daily_free_analyses
-WHERE analysis_date = CURRENT_DATE;
-
 -- 4. Показать все записи (последние 10)
 SELECT 
     id,
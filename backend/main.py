@@ -8,7 +8,7 @@ from contextlib import asynccontextmanager
 from typing import Optional
 from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from pydantic import ValidationError
 
 from config import settings
@@ -46,6 +46,9 @@ from auth_service_supabase import (
 # Import Supabase helpers
 from supabase_client import (
     get_supabase,
+    close_db_pool,
+    close_supabase,
+    keep_supabase_alive,
     check_user_can_analyze,
     record_free_trial_usage,
     get_free_trial_info,
@@ -99,6 +102,12 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 TrendXL 2.0 Backend starting up...")
 
+    # Build the Supabase client up front so the first request doesn't pay for it
+    try:
+        get_supabase()
+    except Exception as e:
+        logger.warning(f"⚠️ Supabase client initialization deferred: {e}")
+
     # Test service connections
     cache_healthy = await cache_service.health_check()
     logger.info(
@@ -127,12 +136,18 @@ async def lifespan(app: FastAPI):
     else:
         logger.info("✅ All services configured properly")
 
+    # Keep pooled Supabase connections from going stale while idle
+    supabase_keepalive = asyncio.create_task(keep_supabase_alive())
+
     yield
 
     # Shutdown
     logger.info("🛑 TrendXL 2.0 Backend shutting down...")
+    supabase_keepalive.cancel()
     await perplexity_service.close()
     await content_relevance_service.close()
+    await close_db_pool()
+    close_supabase()
 
 # Create FastAPI app
 # Check if running in serverless environment (Vercel)
@@ -142,7 +157,8 @@ app = FastAPI(
     title="TrendXL 2.0 Backend API",
     description="TikTok Trend Analysis API using Ensemble Data and OpenAI",
     version="2.0.0",
-    lifespan=None if is_serverless else lifespan
+    lifespan=None if is_serverless else lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -174,7 +190,7 @@ app.add_middleware(
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     """Handle HTTP exceptions"""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content=ErrorResponse(
             error=exc.detail,
@@ -186,7 +202,7 @@ async def http_exception_handler(request, exc):
 @app.exception_handler(ValidationError)
 async def validation_exception_handler(request, exc):
     """Handle validation errors"""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=422,
         content=ErrorResponse(
             error="Validation error in request data",
@@ -200,7 +216,7 @@ async def validation_exception_handler(request, exc):
 async def general_exception_handler(request, exc):
     """Handle general exceptions"""
     logger.error(f"Unhandled exception: {exc}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content=ErrorResponse(
             error="Internal server error",
@@ -386,9 +402,9 @@ async def analyze_trends(
 
         # Acquire lock to prevent duplicate processing
         lock_name = f"analysis:{current_user.id}:{username}"
-        lock_acquired = await cache_service.acquire_lock(lock_name, timeout=60)
+        lock_token = await cache_service.acquire_lock(lock_name, timeout=60)
 
-        if not lock_acquired:
+        if lock_token is None:
             # Another request is already processing, wait and check cache
             logger.info(
                 f"🔒 Analysis in progress for @{username}, waiting for result...")
@@ -418,7 +434,7 @@ async def analyze_trends(
             )
         finally:
             # Always release the lock
-            await cache_service.release_lock(lock_name)
+            await cache_service.release_lock(lock_name, lock_token)
 
         print(f"✅ BACKEND: Analysis completed for @{username}")
         print(f"   - Found {len(result.trends)} trends")
@@ -1141,7 +1157,7 @@ async def get_token_usage_summary(
 @app.get("/api/v1/usage/history")
 async def get_token_usage_history(
     limit: int = 50,
-    offset: int = 0,
+    cursor: Optional[str] = None,
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     """
@@ -1149,10 +1165,12 @@ async def get_token_usage_history(
 
     Query params:
     - limit: Number of records to return (default: 50, max: 100)
-    - offset: Offset for pagination (default: 0)
+    - cursor: next_cursor from the previous page (omit for the first page);
+      an opaque "<analysis_timestamp>|<id>" string
 
     Returns:
     - List of token usage records with timestamps
+    - next_cursor to request the following page (null on the last page)
     """
     try:
         # Get current user from token
@@ -1162,23 +1180,26 @@ async def get_token_usage_history(
         limit = min(limit, 100)
 
         # Get token usage history
-        history = await get_user_token_usage(user_profile["id"], limit, offset)
+        history = await get_user_token_usage(user_profile["id"], limit, cursor)
+        records = history["records"]
 
         logger.info(
-            f"📜 Token usage history requested by user {user_profile['id']} (limit={limit}, offset={offset})")
+            f"📜 Token usage history requested by user {user_profile['id']} (limit={limit}, cursor={cursor})")
 
         return {
             "success": True,
             "data": {
-                "records": history,
-                "count": len(history),
+                "records": records,
+                "count": len(records),
                 "limit": limit,
-                "offset": offset
+                "next_cursor": history["next_cursor"]
             }
         }
 
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"❌ Failed to get token usage history: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -8,8 +8,9 @@ import uvicorn
 from pathlib import Path
 
 # Add current directory to Python path
-current_dir = Path(__file__).parent
-sys.path.insert(0, str(current_dir))
+current_dir = str(Path(__file__).parent)
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
 
 from config import settings
 
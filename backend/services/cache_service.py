@@ -3,44 +3,65 @@ Caching service using Redis for TrendXL 2.0
 """
 import json
 import logging
-from typing import Any, Optional, Dict
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional, Dict
 import redis
 from config import settings
 
 logger = logging.getLogger(__name__)
 
+# Delete the lock only if it still holds our token, so a request whose lock
+# already expired can't release one taken over by another request.
+_RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
 
 class CacheService:
     """Service for caching data using Redis"""
 
-    def __init__(self):
-        """Initialize Redis connection"""
-        # Disable Redis if REDIS_URL is not explicitly set
-        if not settings.redis_url or settings.redis_url.strip() == "":
-            logger.info("ℹ️ Redis caching disabled (REDIS_URL not configured)")
-            self.redis_client = None
-            self.enabled = False
-            return
+    def __init__(self, redis_client: Any = None):
+        """
+        Initialize Redis connection
 
-        try:
-            self.redis_client = redis.from_url(
-                settings.redis_url,
-                decode_responses=True,
-                socket_timeout=5,
-                socket_connect_timeout=5
-            )
-            # Test connection
-            self.redis_client.ping()
-            self.enabled = True
-            logger.info("✅ Redis cache service initialized successfully")
-        except Exception as e:
-            logger.warning(f"Redis not available, caching disabled: {e}")
-            logger.info("💡 To enable Redis caching:")
-            logger.info("   - Install Redis: https://redis.io/download")
-            logger.info("   - Or run: docker run -d -p 6379:6379 redis:alpine")
-            logger.info("   - Or use Redis Cloud: https://redis.com/try-free/")
-            self.redis_client = None
-            self.enabled = False
+        Args:
+            redis_client: Ready client to use instead of connecting to REDIS_URL
+        """
+        self.redis_client = None
+        self.enabled = False
+        self._release_lock_script = None
+
+        if redis_client is None:
+            # Disable Redis if REDIS_URL is not explicitly set
+            if not settings.redis_url or settings.redis_url.strip() == "":
+                logger.info("ℹ️ Redis caching disabled (REDIS_URL not configured)")
+                return
+
+            try:
+                redis_client = redis.from_url(
+                    settings.redis_url,
+                    decode_responses=True,
+                    socket_timeout=5,
+                    socket_connect_timeout=5
+                )
+                # Test connection
+                redis_client.ping()
+            except Exception as e:
+                logger.warning(f"Redis not available, caching disabled: {e}")
+                logger.info("💡 To enable Redis caching:")
+                logger.info("   - Install Redis: https://redis.io/download")
+                logger.info("   - Or run: docker run -d -p 6379:6379 redis:alpine")
+                logger.info("   - Or use Redis Cloud: https://redis.com/try-free/")
+                return
+
+        self.redis_client = redis_client
+        self._release_lock_script = redis_client.register_script(_RELEASE_LOCK_LUA)
+        self.enabled = True
+        logger.info("✅ Redis cache service initialized successfully")
 
     def _get_key(self, key_type: str, identifier: str) -> str:
         """Generate cache key with namespace"""
@@ -232,7 +253,7 @@ class CacheService:
         except Exception:
             return False
 
-    async def acquire_lock(self, lock_name: str, timeout: int = 30, wait_timeout: int = 10) -> bool:
+    async def acquire_lock(self, lock_name: str, timeout: int = 30, wait_timeout: int = 10) -> Optional[str]:
         """
         Acquire a distributed lock using Redis
 
@@ -242,55 +263,77 @@ class CacheService:
             wait_timeout: How long to wait to acquire lock (default 10s)
 
         Returns:
-            True if lock acquired, False otherwise
+            Lock token to pass to release_lock, or None if the lock is held
         """
+        token = uuid.uuid4().hex
         if not self.enabled:
-            return True  # Allow operation if Redis is not available
+            return token  # Allow operation if Redis is not available
 
         try:
             lock_key = f"trendxl:v2:lock:{lock_name}"
-            # SET NX EX: Set if Not eXists with EXpiration
-            result = self.redis_client.set(lock_key, "1", nx=True, ex=timeout)
+            # SET NX PX: Set if Not eXists with millisecond expiration
+            result = self.redis_client.set(
+                lock_key, token, nx=True, px=timeout * 1000)
 
             if result:
                 logger.debug(f"Lock acquired: {lock_name}")
-                return True
+                return token
             else:
                 logger.warning(f"Lock already held: {lock_name}")
-                return False
+                return None
 
         except Exception as e:
             logger.warning(f"Failed to acquire lock {lock_name}: {e}")
-            return True  # Allow operation if lock fails
+            return token  # Allow operation if lock fails
 
-    async def release_lock(self, lock_name: str) -> bool:
+    async def release_lock(self, lock_name: str, token: str) -> bool:
         """
         Release a distributed lock
 
         Args:
             lock_name: Name of the lock to release
+            token: Token returned by acquire_lock
 
         Returns:
-            True if released, False otherwise
+            True if released, False if the lock expired or is held by someone else
         """
         if not self.enabled:
             return True
 
         try:
             lock_key = f"trendxl:v2:lock:{lock_name}"
-            result = self.redis_client.delete(lock_key)
+            result = self._release_lock_script(keys=[lock_key], args=[token])
 
             if result:
                 logger.debug(f"Lock released: {lock_name}")
                 return True
             else:
-                logger.warning(f"Lock not found: {lock_name}")
+                logger.warning(f"Lock not owned or expired: {lock_name}")
                 return False
 
         except Exception as e:
             logger.warning(f"Failed to release lock {lock_name}: {e}")
             return False
 
+    @asynccontextmanager
+    async def lock(self, lock_name: str, timeout: int = 30) -> AsyncIterator[Optional[str]]:
+        """
+        Hold a distributed lock for the duration of an ``async with`` block
+
+        Args:
+            lock_name: Name of the lock
+            timeout: Lock expiration in seconds (default 30s)
+
+        Yields:
+            Lock token, or None if the lock is held by someone else
+        """
+        token = await self.acquire_lock(lock_name, timeout=timeout)
+        try:
+            yield token
+        finally:
+            if token is not None:
+                await self.release_lock(lock_name, token)
+
 
 # Global cache service instance
 cache_service = CacheService()
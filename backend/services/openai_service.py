@@ -67,7 +67,6 @@ class OpenAIService:
             # Use retry with backoff for OpenAI API calls
             result = await retry_with_backoff(
                 func=lambda: self._call_gpt_analysis(top_posts, profile_bio),
-                max_retries=3,
                 base_delay=1.0,
                 retry_condition=self._should_retry_openai_error
             )
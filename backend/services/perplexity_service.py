@@ -4,15 +4,21 @@ Uses Sonar model to analyze TikTok profiles and determine user niches
 """
 import logging
 import asyncio
+import hashlib
 import json
 from typing import Dict, Any, Optional, List
 import httpx
 from pydantic import BaseModel
 from config import settings
+from services.cache_service import cache_service
 from .creative_center_mapping import creative_center_mapping
 
 logger = logging.getLogger(__name__)
 
+# A successful health check is reused for this long instead of spending an
+# API call on every /health request
+HEALTH_CHECK_CACHE_TTL = 60
+
 
 class NicheAnalysis(BaseModel):
     """Niche analysis result model"""
@@ -36,11 +42,13 @@ class PerplexityService:
         self.max_tokens = settings.perplexity_max_tokens
         self.initialized = False
 
-        # HTTP client with timeout and retry configuration
+        # HTTP client with timeout and retry configuration; one pooled client
+        # is shared by every call so the TLS connection is kept alive
         try:
             if self.api_key and len(self.api_key) > 20:
                 self.client = httpx.AsyncClient(
                     timeout=httpx.Timeout(60.0),
+                    limits=httpx.Limits(max_connections=10, keepalive_expiry=30.0),
                     headers={
                         "Authorization": f"Bearer {self.api_key}",
                         "Content-Type": "application/json"
@@ -94,11 +102,25 @@ class PerplexityService:
                 video_count=video_count
             )
 
+            # Identical prompts against the same model get the same answer;
+            # replay it from cache without spending tokens (PERPLEXITY_RESPONSE_CACHE)
+            use_cache = settings.perplexity_response_cache
+            cache_id = hashlib.sha256(
+                f"{self.model}\0{self.temperature}\0{prompt}".encode()).hexdigest()
+            cached = await cache_service.get("niche", cache_id) if use_cache else None
+            if cached is not None:
+                logger.info(f"📋 Cached niche analysis for @{username}")
+                return NicheAnalysis(**cached), {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+
             # Make API request to Perplexity
             response, token_usage = await self._make_api_request(prompt)
 
             # Parse the response into structured niche analysis
-            niche_analysis = self._parse_niche_response(response)
+            niche_analysis, parsed = self._parse_niche_response(response)
+            # Default/guessed analyses are returned but never cached
+            if use_cache and parsed:
+                await cache_service.set("niche", cache_id, niche_analysis.model_dump(),
+                                        ttl=settings.cache_profile_ttl)
 
             logger.info(
                 f"✅ Niche analysis completed for @{username}: {niche_analysis.niche_category}")
@@ -221,8 +243,14 @@ Focus on being specific and actionable. The niche should be clear enough to reco
 
         raise Exception("Perplexity API requests exhausted")
 
-    def _parse_niche_response(self, response: str) -> NicheAnalysis:
-        """Parse Perplexity response into structured NicheAnalysis"""
+    def _parse_niche_response(self, response: str) -> tuple[NicheAnalysis, bool]:
+        """
+        Parse Perplexity response into structured NicheAnalysis
+
+        Returns:
+            Tuple of (NicheAnalysis, whether the niche category was actually
+            parsed rather than filled in from defaults or keyword guessing)
+        """
         try:
             # Extract information using simple parsing
             lines = response.strip().split('\n')
@@ -234,6 +262,7 @@ Focus on being specific and actionable. The niche should be clear enough to reco
             key_topics = ["entertainment", "lifestyle"]
             target_audience = "General audience"
             content_style = "Mixed content"
+            parsed = False
 
             # Parse each line looking for our structured data
             for line in lines:
@@ -241,6 +270,7 @@ Focus on being specific and actionable. The niche should be clear enough to reco
                 if line.startswith('Niche Category:'):
                     niche_category = line.replace(
                         'Niche Category:', '').strip()
+                    parsed = bool(niche_category)
                 elif line.startswith('Niche Description:'):
                     niche_description = line.replace(
                         'Niche Description:', '').strip()
@@ -277,12 +307,12 @@ Focus on being specific and actionable. The niche should be clear enough to reco
                 key_topics=key_topics[:5],  # Limit to 5 topics
                 target_audience=target_audience,
                 content_style=content_style
-            )
+            ), parsed
 
         except Exception as e:
             logger.warning(f"⚠️ Failed to parse Perplexity response: {e}")
             # Return basic analysis from response text
-            return self._create_basic_analysis_from_text(response)
+            return self._create_basic_analysis_from_text(response), False
 
     def _create_basic_analysis_from_text(self, text: str) -> NicheAnalysis:
         """Create basic analysis when parsing fails"""
@@ -349,7 +379,8 @@ Focus on being specific and actionable. The niche should be clear enough to reco
 
     async def close(self):
         """Close HTTP client"""
-        await self.client.aclose()
+        if self.client is not None:
+            await self.client.aclose()
 
     async def analyze_tiktok_account_origin(
         self,
@@ -610,6 +641,9 @@ Limit to top {limit} most relevant hashtags sorted by relevance and performance.
 
     async def health_check(self) -> bool:
         """Check if Perplexity service is available"""
+        if await cache_service.get("health", "perplexity"):
+            return True
+
         try:
             # Simple test request
             test_prompt = "What is TikTok?"
@@ -620,7 +654,12 @@ Limit to top {limit} most relevant hashtags sorted by relevance and performance.
             }
 
             response = await self.client.post(self.base_url, json=payload)
-            return response.status_code == 200
+            if response.status_code != 200:
+                return False
+
+            await cache_service.set("health", "perplexity", True,
+                                    ttl=HEALTH_CHECK_CACHE_TTL)
+            return True
 
         except Exception as e:
             logger.warning(f"⚠️ Perplexity health check failed: {e}")
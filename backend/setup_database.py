@@ -4,7 +4,7 @@ Automatically creates all required tables and functions in Supabase
 """
 import asyncio
 import sys
-from supabase_client import get_supabase
+from supabase_client import SUPABASE_DB_URL, get_db_connection
 
 # SQL для создания таблиц и функций
 SETUP_SQL = """
@@ -20,8 +20,10 @@ CREATE TABLE IF NOT EXISTS public.scan_history (
 );
 
 -- Create indexes for scan_history
-CREATE INDEX IF NOT EXISTS idx_scan_history_user_id ON public.scan_history(user_id);
-CREATE INDEX IF NOT EXISTS idx_scan_history_created_at ON public.scan_history(created_at DESC);
+-- History is always read per user, newest first: one composite index serves
+-- both the filter and the ORDER BY
+DROP INDEX IF EXISTS public.idx_scan_history_user_id, public.idx_scan_history_created_at;
+CREATE INDEX IF NOT EXISTS idx_scan_history_user_date ON public.scan_history(user_id, created_at DESC);
 
 -- Enable RLS for scan_history
 ALTER TABLE public.scan_history ENABLE ROW LEVEL SECURITY;
@@ -43,7 +45,8 @@ CREATE TABLE IF NOT EXISTS public.daily_free_analyses (
 );
 
 -- Create indexes for daily_free_analyses
-CREATE INDEX IF NOT EXISTS idx_daily_free_analyses_user_id ON public.daily_free_analyses(user_id);
+-- (per-user lookups are served by the unique_user_date constraint index)
+DROP INDEX IF EXISTS public.idx_daily_free_analyses_user_id;
 CREATE INDEX IF NOT EXISTS idx_daily_free_analyses_date ON public.daily_free_analyses(analysis_date DESC);
 
 -- Enable RLS for daily_free_analyses
@@ -90,18 +93,15 @@ FUNCTIONS_SQL = """
 -- Function: can_use_free_trial
 CREATE OR REPLACE FUNCTION public.can_use_free_trial(p_user_id UUID)
 RETURNS BOOLEAN
-LANGUAGE plpgsql
+LANGUAGE sql
+STABLE
 SECURITY DEFINER
 AS $$
-DECLARE
-    v_today_count INTEGER;
-BEGIN
-    SELECT COALESCE(analysis_count, 0) INTO v_today_count
-    FROM public.daily_free_analyses
-    WHERE user_id = p_user_id AND analysis_date = CURRENT_DATE;
-    
-    RETURN (v_today_count < 1);
-END;
+    SELECT COALESCE((
+        SELECT analysis_count
+        FROM public.daily_free_analyses
+        WHERE user_id = p_user_id AND analysis_date = CURRENT_DATE
+    ), 0) < 1;
 $$;
 
 -- Function: record_free_trial_usage
@@ -110,12 +110,12 @@ CREATE OR REPLACE FUNCTION public.record_free_trial_usage(
     p_profile_analyzed TEXT DEFAULT NULL
 )
 RETURNS VOID
-LANGUAGE plpgsql
+LANGUAGE sql
+VOLATILE
 SECURITY DEFINER
 AS $$
-BEGIN
     INSERT INTO public.daily_free_analyses (
-        user_id, analysis_date, analysis_count, 
+        user_id, analysis_date, analysis_count,
         last_analysis_timestamp, profile_analyzed
     ) VALUES (
         p_user_id, CURRENT_DATE, 1, NOW(), p_profile_analyzed
@@ -125,7 +125,6 @@ BEGIN
         analysis_count = daily_free_analyses.analysis_count + 1,
         last_analysis_timestamp = NOW(),
         profile_analyzed = COALESCE(EXCLUDED.profile_analyzed, daily_free_analyses.profile_analyzed);
-END;
 $$;
 
 -- Function: get_free_trial_info
@@ -136,55 +135,69 @@ RETURNS TABLE (
     last_used TIMESTAMPTZ,
     total_free_analyses INTEGER
 )
-LANGUAGE plpgsql
+LANGUAGE sql
+STABLE
 SECURITY DEFINER
 AS $$
-BEGIN
-    RETURN QUERY
-    SELECT 
-        public.can_use_free_trial(p_user_id) as can_use_today,
-        COALESCE(today_data.analysis_count, 0)::INTEGER as today_count,
-        today_data.last_analysis_timestamp as last_used,
-        COALESCE(total_data.total, 0)::INTEGER as total_free_analyses
-    FROM (SELECT 1) as dummy
-    LEFT JOIN (
-        SELECT analysis_count, last_analysis_timestamp
-        FROM public.daily_free_analyses
-        WHERE user_id = p_user_id AND analysis_date = CURRENT_DATE
-    ) today_data ON TRUE
-    LEFT JOIN (
-        SELECT SUM(analysis_count)::INTEGER as total
-        FROM public.daily_free_analyses
-        WHERE user_id = p_user_id
-    ) total_data ON TRUE;
-END;
+    -- Single pass over the user's rows: today's usage and lifetime total
+    -- are computed with FILTER aggregates instead of separate subqueries
+    SELECT
+        (COALESCE(SUM(analysis_count) FILTER (WHERE analysis_date = CURRENT_DATE), 0) < 1) as can_use_today,
+        COALESCE(SUM(analysis_count) FILTER (WHERE analysis_date = CURRENT_DATE), 0)::INTEGER as today_count,
+        MAX(last_analysis_timestamp) FILTER (WHERE analysis_date = CURRENT_DATE) as last_used,
+        COALESCE(SUM(analysis_count), 0)::INTEGER as total_free_analyses
+    FROM public.daily_free_analyses
+    WHERE user_id = p_user_id;
+$$;
+
+-- Function: get_access_status
+-- Subscription + free trial gate in one call (used by check_user_can_analyze)
+CREATE OR REPLACE FUNCTION public.get_access_status(p_user_id UUID)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+    SELECT jsonb_build_object(
+        'has_subscription', COALESCE((
+            SELECT lower(stripe_subscription_status) IN ('active', 'trialing')
+            FROM public.profiles
+            WHERE id = p_user_id
+        ), FALSE),
+        'can_use_today', trial.can_use_today,
+        'trial_info', to_jsonb(trial)
+    )
+    FROM public.get_free_trial_info(p_user_id) AS trial;
 $$;
 """
 
 
-async def setup_database():
-    """Setup database tables and functions"""
+# Whole migration as one multi-statement script, sent in a single round trip
+_ALL_SQL = SETUP_SQL + POLICIES_SQL + FUNCTIONS_SQL
+
+# Set once setup has succeeded in this process so repeated calls are no-ops
+_is_installed = False
+
+
+async def setup_database(force: bool = False):
+    """Setup database tables and functions (skipped if already done, unless force)"""
+    global _is_installed
+
+    if _is_installed and not force:
+        return True
+
     try:
         print("🚀 Starting database setup...")
         print("=" * 60)
         
-        # Get Supabase client
-        client = get_supabase()
-        
-        # Step 1: Create tables
-        print("\n📊 Step 1: Creating tables...")
-        result = client.rpc('exec_sql', {'sql': SETUP_SQL}).execute()
-        print("✅ Tables created successfully!")
-        
-        # Step 2: Create policies
-        print("\n🔒 Step 2: Creating RLS policies...")
-        result = client.rpc('exec_sql', {'sql': POLICIES_SQL}).execute()
-        print("✅ Policies created successfully!")
-        
-        # Step 3: Create functions
-        print("\n⚙️  Step 3: Creating functions...")
-        result = client.rpc('exec_sql', {'sql': FUNCTIONS_SQL}).execute()
-        print("✅ Functions created successfully!")
+        # Tables, policies and functions in one execute over a direct
+        # Postgres connection (no exec_sql RPC needed)
+        print("\n📊 Creating tables, RLS policies and functions...")
+        async with get_db_connection() as conn:
+            # Applied atomically; a failure rolls the whole script back
+            async with conn.transaction():
+                await conn.execute(_ALL_SQL)
+        print("✅ Tables, policies and functions created successfully!")
         
         print("\n" + "=" * 60)
         print("🎉 Database setup completed successfully!")
@@ -194,10 +207,12 @@ async def setup_database():
         print("  ✓ can_use_free_trial() function")
         print("  ✓ record_free_trial_usage() function")
         print("  ✓ get_free_trial_info() function")
+        print("  ✓ get_access_status() function")
         print("  ✓ All RLS policies")
         print("\nYou can now start the application!")
         print("=" * 60)
         
+        _is_installed = True
         return True
         
     except Exception as e:
@@ -217,11 +232,12 @@ if __name__ == "__main__":
 ╚══════════════════════════════════════════════════════════╝
     """)
     
-    # Note: Supabase Python client doesn't support exec_sql RPC by default
-    # This will only work if you have that function in your database
-    # Otherwise, user needs to run SQL files manually
-    
-    print("⚠️  NOTE: This script requires manual SQL execution.")
+    # Run the migration directly when a Postgres connection string is set,
+    # otherwise the user needs to run the SQL files manually
+    if SUPABASE_DB_URL:
+        sys.exit(0 if asyncio.run(setup_database()) else 1)
+
+    print("⚠️  NOTE: SUPABASE_DB_URL is not set - manual SQL execution required.")
     print("Please follow these steps:")
     print("\n1. Open Supabase SQL Editor:")
     print("   https://supabase.com/dashboard/project/jynidxwtbjrxmsbfpqra/editor")
@@ -4,8 +4,11 @@ Automatically create Stripe product and price for TrendXL Pro
 from stripe import StripeClient, StripeError
 from config import settings
 import os
+import re
 from pathlib import Path
 
+STRIPE_PRICE_ID_RE = re.compile(r'^STRIPE_PRICE_ID=.*$', re.MULTILINE)
+
 
 def setup_stripe_product():
     """Create TrendXL Pro product and $29/month price"""
@@ -73,25 +76,17 @@ def setup_stripe_product():
             print(f"   STRIPE_PRICE_ID={price.id}")
             return
 
-        # Read current .env
-        with open(env_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-
-        # Update STRIPE_PRICE_ID
-        updated = False
-        for i, line in enumerate(lines):
-            if line.startswith("STRIPE_PRICE_ID="):
-                lines[i] = f"STRIPE_PRICE_ID={price.id}\n"
-                updated = True
-                break
+        # Update STRIPE_PRICE_ID in a single read/substitute/write pass
+        price_line = f"STRIPE_PRICE_ID={price.id}"
+        text = env_path.read_text(encoding='utf-8')
+        new_text, replaced = STRIPE_PRICE_ID_RE.subn(
+            lambda _: price_line, text, count=1)
 
         # If not found, add it
-        if not updated:
-            lines.append(f"\nSTRIPE_PRICE_ID={price.id}\n")
+        if replaced == 0:
+            new_text = text.rstrip() + f"\n{price_line}\n"
 
-        # Write back
-        with open(env_path, 'w', encoding='utf-8') as f:
-            f.writelines(lines)
+        env_path.write_text(new_text, encoding='utf-8')
 
         print(f"✅ .env file updated!")
         print(f"   STRIPE_PRICE_ID={price.id}")
@@ -2,11 +2,22 @@
 Supabase client configuration and helpers
 """
 import os
+import asyncio
 import logging
-from typing import Optional
+import threading
+import uuid
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional
+from urllib.parse import urlparse
+import httpx
 from supabase import create_client, Client
+from supabase.lib.client_options import SyncClientOptions
 from postgrest.exceptions import APIError
 from dotenv import load_dotenv
+from utils import SECONDS_PER_DAY, async_ttl_cache, seconds_until_utc_midnight
+from services.cache_service import cache_service
 
 # Load environment variables from .env file
 load_dotenv()
@@ -26,13 +37,37 @@ SUPABASE_SERVICE_KEY = (
 )
 SUPABASE_KEY = SUPABASE_SERVICE_KEY
 
-# Initialize Supabase client
+# Short-lived cache for access checks polled by the frontend (seconds)
+ACCESS_CHECK_CACHE_TTL = 5
+
+# Direct Postgres connection string (Supavisor pooler or direct connection).
+# Port 6543 is the transaction pooler, port 5432 the session pooler/direct.
+SUPABASE_DB_URL = os.getenv("SUPABASE_DB_URL", "")
+TRANSACTION_POOLER_PORT = 6543
+
+# Connection pool shared by every Supabase request (PostgREST, auth, storage)
+HTTP_POOL_LIMITS = httpx.Limits(
+    max_connections=20, max_keepalive_connections=10, keepalive_expiry=30)
+HTTP_TIMEOUT = httpx.Timeout(10.0, connect=2.0)
+# Ping the REST endpoint this often so idle pooled connections stay fresh
+KEEPALIVE_PING_INTERVAL = 25 * 60
+# Stale-connection errors that are safe to retry on a fresh pool
+_STALE_CONNECTION_ERRORS = (httpx.ConnectError, httpx.RemoteProtocolError)
+
+# Supabase client, created lazily by get_supabase() (or at app startup)
 supabase: Optional[Client] = None
+_http_client: Optional[httpx.Client] = None
+_init_lock = threading.Lock()
+# Bound PostgREST rpc() of the current client (see _execute_rpc)
+_postgrest_rpc = None
+
+# asyncpg pool (session mode only - see get_db_connection)
+_db_pool = None
 
 
 def init_supabase() -> Client:
     """Initialize Supabase client"""
-    global supabase
+    global supabase, _http_client, _postgrest_rpc
 
     if not SUPABASE_URL or not SUPABASE_KEY:
         logger.error(
@@ -41,7 +76,20 @@ def init_supabase() -> Client:
             "Supabase configuration missing. Please set SUPABASE_URL and SUPABASE_SERVICE_KEY")
 
     try:
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+        if _http_client is None:
+            # One keep-alive pool for the whole process instead of a new
+            # TCP/TLS handshake per client
+            _http_client = httpx.Client(
+                limits=HTTP_POOL_LIMITS, timeout=HTTP_TIMEOUT)
+            logger.info(
+                f"🔌 Supabase HTTP pool: max_connections={HTTP_POOL_LIMITS.max_connections}, "
+                f"max_keepalive={HTTP_POOL_LIMITS.max_keepalive_connections}, "
+                f"keepalive_expiry={HTTP_POOL_LIMITS.keepalive_expiry}s")
+
+        supabase = create_client(
+            SUPABASE_URL, SUPABASE_KEY,
+            options=SyncClientOptions(httpx_client=_http_client))
+        _postgrest_rpc = None
         logger.info(
             f"✅ Supabase client initialized successfully (using {'SERVICE_KEY' if 'service_role' in SUPABASE_KEY.lower() or len(SUPABASE_KEY) > 200 else 'ANON_KEY'})")
         return supabase
@@ -51,12 +99,142 @@ def init_supabase() -> Client:
 
 
 def get_supabase() -> Client:
-    """Get Supabase client instance"""
-    global supabase
-    if supabase is None:
-        supabase = init_supabase()
+    """Get Supabase client instance, initializing it on first use"""
+    if supabase is not None:
+        return supabase
+    # Concurrent first requests (threadpool / to_thread) must build it only once
+    with _init_lock:
+        if supabase is None:
+            init_supabase()
     return supabase
 
+
+def close_supabase() -> None:
+    """Close the shared Supabase HTTP connection pool"""
+    global supabase, _http_client, _postgrest_rpc
+    if _http_client is not None:
+        _http_client.close()
+        _http_client = None
+    supabase = None
+    _postgrest_rpc = None
+
+
+def _recycle_supabase(stale_client: Optional[Client]) -> None:
+    """Rebuild the client and its HTTP pool unless another thread already did"""
+    with _init_lock:
+        if supabase is stale_client:
+            logger.warning("♻️ Recycling Supabase HTTP pool after a stale connection")
+            close_supabase()
+            init_supabase()
+
+
+def _execute_rpc(fn: str, params: dict):
+    """
+    Call a database function through a pre-bound PostgREST rpc()
+
+    Skips the Client.rpc -> postgrest property hops on every call of the
+    hot free trial / access RPCs. A connection dropped by the pooler is
+    retried once on a freshly built pool. Blocking - run it via
+    asyncio.to_thread.
+    """
+    global _postgrest_rpc
+    for attempt in range(2):
+        client = get_supabase()
+        rpc = _postgrest_rpc
+        if rpc is None:
+            rpc = _postgrest_rpc = client.postgrest.rpc
+        try:
+            return rpc(fn, params).execute()
+        except _STALE_CONNECTION_ERRORS as e:
+            if attempt:
+                raise
+            logger.warning(f"⚠️ Supabase RPC {fn} hit a stale connection: {e}")
+            _recycle_supabase(client)
+
+
+def _ping_supabase() -> None:
+    """Cheap HEAD on the REST root to keep pooled connections alive"""
+    get_supabase()
+    _http_client.head(f"{SUPABASE_URL}/rest/v1/", headers={"apikey": SUPABASE_KEY})
+
+
+async def keep_supabase_alive(interval: float = KEEPALIVE_PING_INTERVAL) -> None:
+    """Background task: periodically ping Supabase, recycling the pool on failure"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(_ping_supabase)
+        except _STALE_CONNECTION_ERRORS as e:
+            logger.warning(f"⚠️ Supabase keep-alive ping failed: {e}")
+            await asyncio.to_thread(_recycle_supabase, supabase)
+        except Exception as e:
+            logger.warning(f"⚠️ Supabase keep-alive ping failed: {e}")
+
+
+def _is_transaction_pooler(dsn: str) -> bool:
+    """Check if DSN points at the Supavisor/pgbouncer transaction pooler"""
+    return urlparse(dsn).port == TRANSACTION_POOLER_PORT
+
+
+def _pg_connect_kwargs() -> dict:
+    """
+    Connection options that are safe behind a transaction pooler
+
+    Named prepared statements don't survive a pooler handing the next query
+    to another backend ("prepared statement __asyncpg_stmt_X__ does not
+    exist"), so the statement cache is disabled.
+    """
+    return {
+        "statement_cache_size": 0,
+        "server_settings": {"jit": "off"},
+    }
+
+
+@asynccontextmanager
+async def get_db_connection() -> AsyncIterator["asyncpg.Connection"]:
+    """
+    Get a direct Postgres connection for SUPABASE_DB_URL
+
+    Transaction pooler (port 6543): no client-side pool, one connection per
+    call - the pooler does the pooling. Session pooler / direct connection:
+    connections come from a shared asyncpg pool, which rolls back any open
+    transaction and resets session state when they go back to it.
+
+    Usage:
+        async with get_db_connection() as conn:
+            await conn.execute(sql)
+    """
+    global _db_pool
+    import asyncpg
+
+    if not SUPABASE_DB_URL:
+        raise ValueError(
+            "Database connection missing. Please set SUPABASE_DB_URL")
+
+    if _is_transaction_pooler(SUPABASE_DB_URL):
+        conn = await asyncpg.connect(SUPABASE_DB_URL, **_pg_connect_kwargs())
+        try:
+            yield conn
+        finally:
+            await conn.close()
+        return
+
+    if _db_pool is None:
+        _db_pool = await asyncpg.create_pool(
+            SUPABASE_DB_URL, min_size=1, max_size=10, **_pg_connect_kwargs())
+        logger.info("✅ Postgres connection pool created (session mode)")
+
+    async with _db_pool.acquire() as conn:
+        yield conn
+
+
+async def close_db_pool() -> None:
+    """Close the asyncpg pool if it was created"""
+    global _db_pool
+    if _db_pool is not None:
+        await _db_pool.close()
+        _db_pool = None
+
 # Database helper functions
 
 
@@ -90,7 +268,11 @@ async def get_user_by_link(link: str) -> Optional[dict]:
     """Get user by link"""
     try:
         client = get_supabase()
-        response = client.table("users").select("*").eq("link", link).execute()
+        response = (client.table("users")
+                    .select("*")
+                    .eq("link", link)
+                    .limit(1)
+                    .execute())
         return response.data[0] if response.data else None
     except Exception as e:
         logger.error(f"❌ Failed to get user by link: {e}")
@@ -194,8 +376,11 @@ async def get_niche_adapter_by_domain(domain: str) -> Optional[dict]:
     """Get niche adapter by domain"""
     try:
         client = get_supabase()
-        response = client.table("niche_adapters").select(
-            "*").eq("domain", domain).execute()
+        response = (client.table("niche_adapters")
+                    .select("*")
+                    .eq("domain", domain)
+                    .limit(1)
+                    .execute())
         return response.data[0] if response.data else None
     except Exception as e:
         logger.error(f"❌ Failed to get niche adapter: {e}")
@@ -240,21 +425,66 @@ async def record_token_usage(
         raise
 
 
-async def get_user_token_usage(user_id: str, limit: int = 100, offset: int = 0) -> list:
-    """Get token usage history for a user"""
+def _token_usage_cursor(record: dict) -> str:
+    """Opaque history cursor for a record: its timestamp and id"""
+    return f"{record['analysis_timestamp']}|{record['id']}"
+
+
+def _parse_token_usage_cursor(cursor: str) -> tuple[str, str]:
+    """Split a history cursor into (timestamp, id), rejecting malformed input"""
+    timestamp, _, record_id = cursor.rpartition("|")
+    try:
+        datetime.fromisoformat(timestamp)
+        record_id = str(uuid.UUID(record_id))
+    except ValueError:
+        raise ValueError(f"Invalid token usage cursor: {cursor!r}") from None
+    return timestamp, record_id
+
+
+async def get_user_token_usage(user_id: str, limit: int = 100,
+                               cursor: Optional[str] = None) -> dict:
+    """
+    Get token usage history for a user (keyset pagination, newest first)
+
+    Records are ordered by ``(analysis_timestamp, id)`` so rows sharing a
+    timestamp are neither skipped nor repeated across pages.
+
+    Args:
+        user_id: Supabase user ID
+        limit: Maximum number of records to return
+        cursor: ``next_cursor`` from the previous page; omit to start from
+            the most recent record
+
+    Returns:
+        Dict with ``records`` and ``next_cursor`` (None when no more pages)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if cursor:
+        timestamp, record_id = _parse_token_usage_cursor(cursor)
+
     try:
         client = get_supabase()
-        response = (client.table("token_usage")
-                    .select("*")
-                    .eq("user_id", user_id)
+        query = (client.table("token_usage")
+                 .select("*")
+                 .eq("user_id", user_id))
+        if cursor:
+            query = query.or_(
+                f'analysis_timestamp.lt."{timestamp}",'
+                f'and(analysis_timestamp.eq."{timestamp}",id.lt.{record_id})')
+        response = (query
                     .order("analysis_timestamp", desc=True)
+                    .order("id", desc=True)
                     .limit(limit)
-                    .range(offset, offset + limit - 1)
                     .execute())
-        return response.data if response.data else []
+        records = response.data if response.data else []
+        next_cursor = (_token_usage_cursor(records[-1])
+                       if len(records) == limit else None)
+        return {"records": records, "next_cursor": next_cursor}
     except Exception as e:
         logger.error(f"❌ Failed to get token usage: {e}")
-        return []
+        return {"records": [], "next_cursor": None}
 
 
 async def get_user_token_summary(user_id: str) -> dict:
@@ -282,28 +512,31 @@ async def get_user_token_summary(user_id: str) -> dict:
                 "last_analysis": None
             }
 
-        # Aggregate data
+        # Aggregate data in a single pass over the records
         total_analyses = len(records)
-        total_openai_tokens = sum(
-            r.get("openai_total_tokens", 0) for r in records)
-        total_openai_prompt = sum(
-            r.get("openai_prompt_tokens", 0) for r in records)
-        total_openai_completion = sum(
-            r.get("openai_completion_tokens", 0) for r in records)
-        total_perplexity_tokens = sum(
-            r.get("perplexity_total_tokens", 0) for r in records)
-        total_perplexity_prompt = sum(
-            r.get("perplexity_prompt_tokens", 0) for r in records)
-        total_perplexity_completion = sum(
-            r.get("perplexity_completion_tokens", 0) for r in records)
-        total_ensemble_units = sum(r.get("ensemble_units", 0) for r in records)
-        total_cost = sum(float(r.get("total_cost_estimate", 0))
-                         for r in records)
-
-        timestamps = [r.get("analysis_timestamp")
-                      for r in records if r.get("analysis_timestamp")]
-        first_analysis = min(timestamps) if timestamps else None
-        last_analysis = max(timestamps) if timestamps else None
+        total_openai_tokens = total_openai_prompt = total_openai_completion = 0
+        total_perplexity_tokens = total_perplexity_prompt = total_perplexity_completion = 0
+        total_ensemble_units = 0
+        total_cost = 0.0
+        first_analysis = last_analysis = None
+
+        for r in records:
+            total_openai_tokens += r.get("openai_total_tokens") or 0
+            total_openai_prompt += r.get("openai_prompt_tokens") or 0
+            total_openai_completion += r.get("openai_completion_tokens") or 0
+            total_perplexity_tokens += r.get("perplexity_total_tokens") or 0
+            total_perplexity_prompt += r.get("perplexity_prompt_tokens") or 0
+            total_perplexity_completion += r.get(
+                "perplexity_completion_tokens") or 0
+            total_ensemble_units += r.get("ensemble_units") or 0
+            total_cost += float(r.get("total_cost_estimate") or 0)
+
+            timestamp = r.get("analysis_timestamp")
+            if timestamp:
+                if first_analysis is None or timestamp < first_analysis:
+                    first_analysis = timestamp
+                if last_analysis is None or timestamp > last_analysis:
+                    last_analysis = timestamp
 
         return {
             "total_analyses": total_analyses,
@@ -326,7 +559,6 @@ async def get_user_token_summary(user_id: str) -> dict:
 async def get_user_token_usage_by_period(user_id: str, period_days: int = 30) -> dict:
     """Get token usage summary for a specific time period"""
     try:
-        from datetime import datetime, timedelta
         client = get_supabase()
 
         # Calculate start date
@@ -351,14 +583,15 @@ async def get_user_token_usage_by_period(user_id: str, period_days: int = 30) ->
                 "total_cost": 0.0
             }
 
-        # Aggregate data
+        # Aggregate data in a single pass over the records
         analyses_count = len(records)
-        openai_tokens = sum(r.get("openai_total_tokens", 0) for r in records)
-        perplexity_tokens = sum(
-            r.get("perplexity_total_tokens", 0) for r in records)
-        ensemble_units = sum(r.get("ensemble_units", 0) for r in records)
-        total_cost = sum(float(r.get("total_cost_estimate", 0))
-                         for r in records)
+        openai_tokens = perplexity_tokens = ensemble_units = 0
+        total_cost = 0.0
+        for r in records:
+            openai_tokens += r.get("openai_total_tokens") or 0
+            perplexity_tokens += r.get("perplexity_total_tokens") or 0
+            ensemble_units += r.get("ensemble_units") or 0
+            total_cost += float(r.get("total_cost_estimate") or 0)
 
         return {
             "period_days": period_days,
@@ -399,7 +632,6 @@ async def update_user_subscription(
 ) -> dict:
     """Update user's subscription information"""
     try:
-        from datetime import datetime
         client = get_supabase()
 
         update_data = {
@@ -416,6 +648,7 @@ async def update_user_subscription(
                     .update(update_data)
                     .eq("id", user_id)
                     .execute())
+        _fetch_subscription_active.invalidate(user_id)
         logger.info(f"✅ Updated subscription for user {user_id}: {status}")
         return response.data[0] if response.data else {}
     except Exception as e:
@@ -437,6 +670,29 @@ async def get_user_subscription_info(user_id: str) -> Optional[dict]:
         return None
 
 
+@async_ttl_cache(ACCESS_CHECK_CACHE_TTL)
+async def _fetch_subscription_active(user_id: str) -> bool:
+    """Subscription state from profiles; raises on errors so they aren't cached"""
+    client = get_supabase()
+    # Only the status column is needed here, not the full subscription info
+    response = (client.table("profiles")
+                .select("stripe_subscription_status")
+                .eq("id", user_id)
+                .limit(1)
+                .execute())
+
+    if not response.data:
+        return False
+
+    status = response.data[0].get("stripe_subscription_status") or ""
+
+    # Check if subscription is in active state
+    # Active states: 'active', 'trialing'
+    active_states = ['active', 'trialing']
+
+    return status.lower() in active_states
+
+
 async def check_active_subscription(user_id: str) -> bool:
     """
     Check if user has an active subscription
@@ -448,31 +704,25 @@ async def check_active_subscription(user_id: str) -> bool:
         True if user has active subscription, False otherwise
     """
     try:
-        subscription_info = await get_user_subscription_info(user_id)
-
-        if not subscription_info:
-            return False
-
-        status = subscription_info.get("stripe_subscription_status", "")
-
-        # Check if subscription is in active state
-        # Active states: 'active', 'trialing'
-        active_states = ['active', 'trialing']
-
-        return status.lower() in active_states
-
+        return await _fetch_subscription_active(user_id)
     except Exception as e:
         logger.error(f"❌ Failed to check subscription status: {e}")
         return False
 
 
 async def get_user_by_stripe_customer_id(stripe_customer_id: str) -> Optional[dict]:
-    """Get user by Stripe customer ID"""
+    """
+    Get user by Stripe customer ID
+
+    Only the profile ``id`` is selected - webhook handlers use this purely to
+    resolve the user; fetch the rest of the profile separately if needed.
+    """
     try:
         client = get_supabase()
         response = (client.table("profiles")
-                    .select("*")
+                    .select("id")
                     .eq("stripe_customer_id", stripe_customer_id)
+                    .limit(1)
                     .execute())
         return response.data[0] if response.data else None
     except Exception as e:
@@ -484,6 +734,11 @@ async def get_user_by_stripe_customer_id(stripe_customer_id: str) -> Optional[di
 # Free Trial Functions (1 free analysis per day)
 # ============================================================================
 
+def _free_trial_cache_id(user_id: str) -> str:
+    """Cache identifier for a user's free trial info for the current UTC day"""
+    return f"{user_id}:{int(time.time()) // SECONDS_PER_DAY}"
+
+
 async def can_use_free_trial(user_id: str) -> bool:
     """
     Check if user can use their daily free trial (1 analysis per day)
@@ -495,11 +750,9 @@ async def can_use_free_trial(user_id: str) -> bool:
         True if user can use free trial today, False otherwise
     """
     try:
-        client = get_supabase()
-
-        # Call the database function
-        response = client.rpc('can_use_free_trial', {
-                              'p_user_id': user_id}).execute()
+        # Call the database function (off the event loop)
+        response = await asyncio.to_thread(
+            _execute_rpc, 'can_use_free_trial', {'p_user_id': user_id})
 
         if response.data is not None:
             return bool(response.data)
@@ -526,21 +779,24 @@ async def record_free_trial_usage(user_id: str, profile_analyzed: Optional[str]
         True if recorded successfully, False otherwise
     """
     try:
-        client = get_supabase()
-
         logger.info(
             f"🎯 CALLING record_free_trial_usage for user {user_id}, profile: {profile_analyzed}")
 
-        # Call the database function
-        response = client.rpc('record_free_trial_usage', {
-            'p_user_id': user_id,
-            'p_profile_analyzed': profile_analyzed
-        }).execute()
+        # Call the database function (off the event loop)
+        response = await asyncio.to_thread(
+            _execute_rpc, 'record_free_trial_usage', {
+                'p_user_id': user_id,
+                'p_profile_analyzed': profile_analyzed
+            })
 
         logger.info(
             f"✅ Successfully recorded free trial usage for user {user_id}")
         logger.info(f"📊 RPC Response: {response}")
 
+        # Drop the cached info so the verification below reads the new count
+        _fetch_free_trial_info.invalidate(user_id)
+        await cache_service.delete("free_trial", _free_trial_cache_id(user_id))
+
         # Verify it was recorded by checking the count
         trial_info = await get_free_trial_info(user_id)
         logger.info(
@@ -558,6 +814,28 @@ async def record_free_trial_usage(user_id: str, profile_analyzed: Optional[str]
         raise Exception(f"Failed to record free trial usage: {str(e)}") from e
 
 
+@async_ttl_cache(ACCESS_CHECK_CACHE_TTL)
+async def _fetch_free_trial_info(user_id: str) -> Optional[dict]:
+    """Free trial info from Redis or the database; raises on errors so they aren't cached"""
+    cache_id = _free_trial_cache_id(user_id)
+    cached = await cache_service.get("free_trial", cache_id)
+    if cached is not None:
+        return cached
+
+    # Call the database function (off the event loop)
+    response = await asyncio.to_thread(
+        _execute_rpc, 'get_free_trial_info', {'p_user_id': user_id})
+
+    if response.data and len(response.data) > 0:
+        trial_info = response.data[0]
+        # Valid until the day rolls over (or until usage is recorded)
+        await cache_service.set("free_trial", cache_id, trial_info,
+                                ttl=seconds_until_utc_midnight())
+        return trial_info
+
+    return None
+
+
 async def get_free_trial_info(user_id: str) -> Optional[dict]:
     """
     Get detailed information about user's free trial usage
@@ -569,16 +847,7 @@ async def get_free_trial_info(user_id: str) -> Optional[dict]:
         Dict with free trial info or None
     """
     try:
-        client = get_supabase()
-
-        # Call the database function
-        response = client.rpc('get_free_trial_info', {
-                              'p_user_id': user_id}).execute()
-
-        if response.data and len(response.data) > 0:
-            return response.data[0]
-
-        return None
+        return await _fetch_free_trial_info(user_id)
 
     except Exception as e:
         logger.error(f"❌ Failed to get free trial info: {e}")
@@ -595,16 +864,54 @@ async def get_free_trial_info(user_id: str) -> Optional[dict]:
         }
 
 
-async def check_user_can_analyze(user_id: str) -> tuple[bool, str, Optional[dict]]:
+async def check_user_can_analyze(
+    user_id: str,
+    include_info: bool = False
+) -> tuple[bool, str, Optional[dict]]:
     """
     Check if user can perform an analysis (either has subscription or free trial available)
 
     Args:
         user_id: Supabase user ID
+        include_info: Attach free trial info to the "free_trial" details.
+            It is always included for "no_access", where it is shown to the user.
 
     Returns:
         Tuple of (can_analyze: bool, reason: str, details: dict)
     """
+    try:
+        # Subscription + free trial status in a single round trip
+        response = await asyncio.to_thread(
+            _execute_rpc, 'get_access_status', {'p_user_id': user_id})
+        status = response.data or {}
+    except Exception as e:
+        # get_access_status may not be migrated yet - use the individual RPCs
+        logger.warning(
+            f"⚠️ get_access_status unavailable, falling back to separate checks: {e}")
+        return await _check_user_can_analyze_separately(user_id, include_info)
+
+    if status.get("has_subscription"):
+        return True, "active_subscription", {"type": "subscription"}
+
+    trial_info = status.get("trial_info")
+    if status.get("can_use_today"):
+        if include_info:
+            return True, "free_trial", {"type": "free_trial", "info": trial_info}
+        return True, "free_trial", {"type": "free_trial"}
+
+    # User cannot analyze - no subscription and free trial exhausted
+    return False, "no_access", {
+        "type": "no_access",
+        "trial_info": trial_info,
+        "message": "You've used your free daily analysis. Subscribe to get unlimited access!"
+    }
+
+
+async def _check_user_can_analyze_separately(
+    user_id: str,
+    include_info: bool = False
+) -> tuple[bool, str, Optional[dict]]:
+    """check_user_can_analyze via the individual subscription/free trial RPCs"""
     try:
         # Check if user has active subscription
         has_subscription = await check_active_subscription(user_id)
@@ -616,11 +923,14 @@ async def check_user_can_analyze(user_id: str) -> tuple[bool, str, Optional[dict
         can_use_trial = await can_use_free_trial(user_id)
 
         if can_use_trial:
-            trial_info = await get_free_trial_info(user_id)
-            return True, "free_trial", {"type": "free_trial", "info": trial_info}
+            if include_info:
+                trial_info = await get_free_trial_info(user_id)
+                return True, "free_trial", {"type": "free_trial", "info": trial_info}
+            return True, "free_trial", {"type": "free_trial"}
 
-        # User cannot analyze - no subscription and free trial exhausted
         trial_info = await get_free_trial_info(user_id)
+
+        # User cannot analyze - no subscription and free trial exhausted
         return False, "no_access", {
             "type": "no_access",
             "trial_info": trial_info,
@@ -631,9 +941,3 @@ async def check_user_can_analyze(user_id: str) -> tuple[bool, str, Optional[dict
         logger.error(f"❌ Failed to check if user can analyze: {e}")
         return False, "error", {"type": "error", "message": str(e)}
 
-
-# Initialize on module import
-try:
-    init_supabase()
-except Exception as e:
-    logger.warning(f"⚠️ Supabase client initialization deferred: {e}")
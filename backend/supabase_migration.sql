@@ -62,7 +62,9 @@ CREATE TABLE IF NOT EXISTS public.interaction_log (
 );
 
 -- Create indexes for InteractionLog table
-CREATE INDEX IF NOT EXISTS idx_interaction_log_user_id ON public.interaction_log(user_id);
+-- Per-user timelines filter on user_id and sort by timestamp: one composite index
+DROP INDEX IF EXISTS public.idx_interaction_log_user_id;
+CREATE INDEX IF NOT EXISTS idx_interaction_log_user_timestamp ON public.interaction_log(user_id, timestamp DESC);
 CREATE INDEX IF NOT EXISTS idx_interaction_log_trend_id ON public.interaction_log(trend_id);
 CREATE INDEX IF NOT EXISTS idx_interaction_log_action_type ON public.interaction_log(action_type);
 CREATE INDEX IF NOT EXISTS idx_interaction_log_timestamp ON public.interaction_log(timestamp DESC);
@@ -169,6 +171,57 @@ CREATE TRIGGER update_niche_adapters_updated_at
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
 
+-- Seed one row per table for test_supabase_connection.py in a single round trip
+CREATE OR REPLACE FUNCTION seed_test_data(
+    p_link TEXT DEFAULT 'https://tiktok.com/@test_user_12345',
+    p_domain TEXT DEFAULT 'tech-reviews'
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_user_id UUID;
+    v_trend_id UUID;
+    v_interaction_id UUID;
+    v_adapter_id UUID;
+BEGIN
+    INSERT INTO public.users (link, parsed_niche, location, followers, engagement_rate, top_posts)
+    VALUES (
+        p_link, 'Tech Reviews', 'US', 5000, 4.2,
+        '[{"id": "post1", "views": 10000, "likes": 500},
+          {"id": "post2", "views": 15000, "likes": 750}]'::jsonb
+    )
+    RETURNING id INTO v_user_id;
+
+    INSERT INTO public.trend_feed (user_id, trend_title, platform, video_url, stat_metrics, relevance_score)
+    VALUES (
+        v_user_id, 'AI Content Creation', 'tiktok', 'https://tiktok.com/@test/video/123',
+        '{"views": 50000, "likes": 2500, "comments": 150, "shares": 80}'::jsonb, 8.5
+    )
+    RETURNING id INTO v_trend_id;
+
+    INSERT INTO public.interaction_log (user_id, trend_id, action_type)
+    VALUES (v_user_id, v_trend_id, 'watched')
+    RETURNING id INTO v_interaction_id;
+
+    INSERT INTO public.niche_adapters (domain, parsed_by_gpt_summary, topic_tags)
+    VALUES (
+        p_domain, 'Technology product reviews and comparisons',
+        '["tech", "reviews", "gadgets", "electronics"]'::jsonb
+    )
+    RETURNING id INTO v_adapter_id;
+
+    RETURN jsonb_build_object(
+        'user_id', v_user_id,
+        'trend_id', v_trend_id,
+        'interaction_id', v_interaction_id,
+        'adapter_id', v_adapter_id
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Test helper only: keep it away from anon/authenticated clients
+REVOKE ALL ON FUNCTION seed_test_data(TEXT, TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION seed_test_data(TEXT, TEXT) TO service_role;
+
 -- ============================================================================
 -- Comments for documentation
 -- ============================================================================
@@ -18,9 +18,11 @@ CREATE TABLE IF NOT EXISTS public.scan_history (
 );
 
 -- Create indexes for scan_history
-CREATE INDEX IF NOT EXISTS idx_scan_history_user_id ON public.scan_history(user_id);
+-- (user_id, created_at DESC) serves both per-user lookups and newest-first
+-- history pages, so the single-column user_id/created_at indexes are dropped
+DROP INDEX IF EXISTS public.idx_scan_history_user_id;
+DROP INDEX IF EXISTS public.idx_scan_history_created_at;
 CREATE INDEX IF NOT EXISTS idx_scan_history_username ON public.scan_history(username);
-CREATE INDEX IF NOT EXISTS idx_scan_history_created_at ON public.scan_history(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_scan_history_user_date ON public.scan_history(user_id, created_at DESC);
 
 -- Enable Row Level Security
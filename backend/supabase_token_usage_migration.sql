@@ -57,8 +57,12 @@ CREATE TABLE IF NOT EXISTS public.token_usage (
 );
 
 -- Create indexes for token_usage table
-CREATE INDEX IF NOT EXISTS idx_token_usage_user_id ON public.token_usage(user_id);
+-- Per-user history pages (keyset pagination on analysis_timestamp, id) are
+-- served by the composite index, which makes a separate user_id index redundant
+DROP INDEX IF EXISTS public.idx_token_usage_user_id;
+DROP INDEX IF EXISTS public.idx_token_usage_user_timestamp;
 CREATE INDEX IF NOT EXISTS idx_token_usage_timestamp ON public.token_usage(analysis_timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_token_usage_user_timestamp_id ON public.token_usage(user_id, analysis_timestamp DESC, id DESC);
 
 -- Enable RLS
 ALTER TABLE public.token_usage ENABLE ROW LEVEL SECURITY;
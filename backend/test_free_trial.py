@@ -2,9 +2,16 @@
 Test script for Free Trial functionality
 Run this to verify the free trial system is working correctly
 """
+import argparse
 import asyncio
+import io
 import sys
+import traceback
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Awaitable, Dict, List, Optional, TextIO
 from supabase_client import (
+    get_supabase,
     can_use_free_trial,
     record_free_trial_usage,
     get_free_trial_info,
@@ -12,6 +19,12 @@ from supabase_client import (
     check_active_subscription
 )
 
+# uvloop ships with uvicorn[standard]; fall back to the stock loop without it
+try:
+    from uvloop import run as run_async
+except ImportError:
+    from asyncio import run as run_async
+
 # Color codes for terminal output
 GREEN = '\033[92m'
 RED = '\033[91m'
@@ -19,116 +32,152 @@ YELLOW = '\033[93m'
 BLUE = '\033[94m'
 RESET = '\033[0m'
 
+# Colored fragments, built once and reused by every print helper
+BANNER_TOP = f"\n{BLUE}{'=' * 80}\n"
+BANNER_BOTTOM = f"\n{'=' * 80}{RESET}\n\n"
+SUCCESS_PREFIX = f"{GREEN}✅ "
+ERROR_PREFIX = f"{RED}❌ "
+INFO_PREFIX = f"{YELLOW}ℹ️  "
+LINE_END = f"{RESET}\n"
+
+# One lock per user: the full check reads eligibility and then records usage,
+# so the same user listed twice must not run it concurrently
+_trial_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+# Where the current task's report goes; unset means straight to stdout
+_output: ContextVar[Optional[TextIO]] = ContextVar("_output", default=None)
+
+
+def write(text: str):
+    """Write to the current report"""
+    (_output.get() or sys.stdout).write(text)
+
+
+def emit(text: str = ""):
+    """Write one line of the current report"""
+    write(text + "\n")
+
+
+def print_banner(title: str):
+    """Print a section banner in a single write"""
+    write(BANNER_TOP + title + BANNER_BOTTOM)
+
 
 def print_test(name: str):
     """Print test name"""
-    print(f"\n{BLUE}{'='*80}")
-    print(f"TEST: {name}")
-    print(f"{'='*80}{RESET}\n")
+    print_banner("TEST: " + name)
 
 
 def print_success(message: str):
     """Print success message"""
-    print(f"{GREEN}✅ {message}{RESET}")
+    write(SUCCESS_PREFIX + message + LINE_END)
 
 
 def print_error(message: str):
     """Print error message"""
-    print(f"{RED}❌ {message}{RESET}")
+    write(ERROR_PREFIX + message + LINE_END)
 
 
 def print_info(message: str):
     """Print info message"""
-    print(f"{YELLOW}ℹ️  {message}{RESET}")
+    write(INFO_PREFIX + message + LINE_END)
 
 
-async def test_free_trial_system(user_id: str):
+async def test_free_trial_system(user_id: str, record: Optional[bool] = None):
     """
     Test the free trial system with a specific user ID
 
     Args:
         user_id: Supabase user UUID to test with
+        record: Consume today's free trial if eligible (True), skip it (False),
+            or ask interactively (None)
     """
-    print(f"\n{BLUE}{'='*80}")
-    print(f"🧪 TESTING FREE TRIAL SYSTEM")
-    print(f"{'='*80}{RESET}\n")
+    print_banner("🧪 TESTING FREE TRIAL SYSTEM")
     print_info(f"Testing with user ID: {user_id}")
 
+    # Every call below should go through the same pooled client
+    client_id = id(get_supabase())
+
+    # Tests 1-4 are independent reads: fetch them together, report in order
+    (has_subscription, can_use, trial_info, can_analyze_result) = await asyncio.gather(
+        check_active_subscription(user_id),
+        can_use_free_trial(user_id),
+        get_free_trial_info(user_id),
+        check_user_can_analyze(user_id, include_info=True),
+        return_exceptions=True
+    )
+
     # Test 1: Check if user has subscription
     print_test("Check Active Subscription")
-    try:
-        has_subscription = await check_active_subscription(user_id)
-        if has_subscription:
-            print_success("User has active subscription")
-        else:
-            print_info(
-                "User does not have subscription (expected for free trial test)")
-    except Exception as e:
-        print_error(f"Failed to check subscription: {e}")
+    if isinstance(has_subscription, Exception):
+        print_error(f"Failed to check subscription: {has_subscription}")
         return
+    if has_subscription:
+        print_success("User has active subscription")
+    else:
+        print_info(
+            "User does not have subscription (expected for free trial test)")
 
     # Test 2: Check if user can use free trial
     print_test("Check Free Trial Eligibility")
-    try:
-        can_use = await can_use_free_trial(user_id)
-        if can_use:
-            print_success("User CAN use free trial today")
-        else:
-            print_info("User CANNOT use free trial today (already used)")
-    except Exception as e:
-        print_error(f"Failed to check free trial: {e}")
+    if isinstance(can_use, Exception):
+        print_error(f"Failed to check free trial: {can_use}")
         return
+    if can_use:
+        print_success("User CAN use free trial today")
+    else:
+        print_info("User CANNOT use free trial today (already used)")
 
     # Test 3: Get free trial info
     print_test("Get Free Trial Info")
-    try:
-        trial_info = await get_free_trial_info(user_id)
-        if trial_info:
-            print_success("Free trial info retrieved:")
-            print(f"   - Can use today: {trial_info.get('can_use_today')}")
-            print(f"   - Today count: {trial_info.get('today_count')}")
-            print(
-                f"   - Total free analyses: {trial_info.get('total_free_analyses')}")
-            print(f"   - Last used: {trial_info.get('last_used')}")
-        else:
-            print_info("No free trial info yet (user hasn't used any)")
-    except Exception as e:
-        print_error(f"Failed to get free trial info: {e}")
+    if isinstance(trial_info, Exception):
+        print_error(f"Failed to get free trial info: {trial_info}")
         return
+    if trial_info:
+        print_success("Free trial info retrieved:")
+        emit(f"   - Can use today: {trial_info.get('can_use_today')}")
+        emit(f"   - Today count: {trial_info.get('today_count')}")
+        emit(
+            f"   - Total free analyses: {trial_info.get('total_free_analyses')}")
+        emit(f"   - Last used: {trial_info.get('last_used')}")
+    else:
+        print_info("No free trial info yet (user hasn't used any)")
 
     # Test 4: Check if user can analyze
     print_test("Check User Can Analyze")
-    try:
-        can_analyze, reason, details = await check_user_can_analyze(user_id)
-        if can_analyze:
-            print_success(f"User CAN analyze (reason: {reason})")
-            print(f"   Details: {details}")
-        else:
-            print_error(f"User CANNOT analyze (reason: {reason})")
-            print(f"   Details: {details}")
-    except Exception as e:
-        print_error(f"Failed to check if user can analyze: {e}")
+    if isinstance(can_analyze_result, Exception):
+        print_error(f"Failed to check if user can analyze: {can_analyze_result}")
         return
+    can_analyze, reason, details = can_analyze_result
+    if can_analyze:
+        print_success(f"User CAN analyze (reason: {reason})")
+        emit(f"   Details: {details}")
+    else:
+        print_error(f"User CANNOT analyze (reason: {reason})")
+        emit(f"   Details: {details}")
 
     # Test 5: Record free trial usage (if eligible)
+    # The info fetched above stays current until usage is recorded
+    latest_info = trial_info
     if can_use and not has_subscription:
         print_test("Record Free Trial Usage")
         print_info("This will consume 1 free trial for today!")
-        response = input("Continue? (y/n): ")
+        if record is None:
+            record = input("Continue? (y/n): ").lower() == 'y'
 
-        if response.lower() == 'y':
+        if record:
             try:
                 success = await record_free_trial_usage(user_id, "test_profile")
                 if success:
                     print_success("Free trial usage recorded successfully")
 
                     # Verify the record was created
-                    new_info = await get_free_trial_info(user_id)
+                    new_info = latest_info = await get_free_trial_info(user_id)
                     if new_info:
                         print_success("Verification: Free trial info updated")
-                        print(
+                        emit(
                             f"   - Today count: {new_info.get('today_count')}")
-                        print(
+                        emit(
                             f"   - Can use today: {new_info.get('can_use_today')}")
                 else:
                     print_error("Failed to record free trial usage")
@@ -138,29 +187,64 @@ async def test_free_trial_system(user_id: str):
             print_info("Skipped recording free trial usage")
 
     # Final summary
-    print(f"\n{BLUE}{'='*80}")
-    print(f"✨ TEST SUMMARY")
-    print(f"{'='*80}{RESET}\n")
+    print_banner("✨ TEST SUMMARY")
 
-    final_info = await get_free_trial_info(user_id)
+    final_info = latest_info
     if final_info:
-        print(f"Today's usage: {final_info.get('today_count')}/1")
-        print(f"Total free analyses: {final_info.get('total_free_analyses')}")
-        print(
+        emit(f"Today's usage: {final_info.get('today_count')}/1")
+        emit(f"Total free analyses: {final_info.get('total_free_analyses')}")
+        emit(
             f"Can use today: {'Yes ✅' if final_info.get('can_use_today') else 'No ❌'}")
     else:
-        print("No free trial usage recorded yet")
+        emit("No free trial usage recorded yet")
+
+    if id(get_supabase()) == client_id:
+        print_success("All calls reused the shared Supabase client")
+    else:
+        print_error("Supabase client was re-created during the test run")
 
 
 async def quick_check(user_id: str):
     """Quick check of free trial status"""
-    can_analyze, reason, details = await check_user_can_analyze(user_id)
+    can_analyze, reason, details = await check_user_can_analyze(user_id, include_info=True)
+
+    emit(f"\n{BLUE}Quick Free Trial Check{RESET}")
+    emit(f"User: {user_id}")
+    emit(f"Can analyze: {can_analyze}")
+    emit(f"Reason: {reason}")
+    emit(f"Details: {details}\n")
+
 
-    print(f"\n{BLUE}Quick Free Trial Check{RESET}")
-    print(f"User: {user_id}")
-    print(f"Can analyze: {can_analyze}")
-    print(f"Reason: {reason}")
-    print(f"Details: {details}\n")
+async def buffered(check: Awaitable[None]):
+    """Collect a check's report in memory and write it out in one piece"""
+    buffer = io.StringIO()
+    _output.set(buffer)  # local to this task's context
+    try:
+        await check
+    finally:
+        sys.stdout.write(buffer.getvalue())
+        sys.stdout.flush()
+
+
+async def locked(user_id: str, check: Awaitable[None]):
+    """Run a check while holding the user's free trial lock"""
+    async with _trial_locks[user_id]:
+        await check
+
+
+async def run_all(user_ids: List[str], quick: bool, record: Optional[bool]):
+    """Check every user concurrently"""
+    if quick:
+        checks = [quick_check(user_id) for user_id in user_ids]
+    else:
+        checks = [locked(user_id, test_free_trial_system(user_id, record))
+                  for user_id in user_ids]
+
+    # An interactive run prompts mid-report, so it has to print as it goes
+    if record is None and not quick:
+        await asyncio.gather(*checks)
+    else:
+        await asyncio.gather(*(buffered(check) for check in checks))
 
 
 def main():
@@ -169,27 +253,26 @@ def main():
     print(f"║  FREE TRIAL SYSTEM TEST SCRIPT            ║")
     print(f"╚════════════════════════════════════════════╝{RESET}\n")
 
-    if len(sys.argv) < 2:
-        print_error("Usage: python test_free_trial.py <user_uuid> [--quick]")
-        print_info(
-            "Example: python test_free_trial.py 12345678-1234-1234-1234-123456789abc")
-        print_info(
-            "Quick check: python test_free_trial.py 12345678-1234-1234-1234-123456789abc --quick")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Test the free trial system for one or more users",
+        epilog="Example: python test_free_trial.py 12345678-1234-1234-1234-123456789abc --record")
+    parser.add_argument("user_ids", nargs="+", metavar="user_uuid",
+                        help="Supabase user UUID(s) to test with")
+    parser.add_argument("--quick", action="store_true",
+                        help="Only run the quick access check")
+    parser.add_argument("--record", action="store_true",
+                        help="Consume today's free trial without prompting")
+    args = parser.parse_args()
 
-    user_id = sys.argv[1]
-    quick_mode = "--quick" in sys.argv
+    # Only prompt when a single user is tested interactively
+    record = True if args.record else (None if len(args.user_ids) == 1 else False)
 
     try:
-        if quick_mode:
-            asyncio.run(quick_check(user_id))
-        else:
-            asyncio.run(test_free_trial_system(user_id))
+        run_async(run_all(args.user_ids, args.quick, record))
     except KeyboardInterrupt:
         print_info("\nTest interrupted by user")
     except Exception as e:
         print_error(f"Test failed with error: {e}")
-        import traceback
         traceback.print_exc()
 
 
@@ -1,28 +1,27 @@
 """
 Test Supabase connection and database operations
 """
+import asyncio
+import os
+import sys
+
+# Add backend to path
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
 from supabase_client import (
     get_supabase,
-    insert_user,
     get_user_by_link,
-    insert_trend,
     get_trends_by_user,
-    insert_interaction,
     get_user_interactions,
-    insert_niche_adapter,
     get_niche_adapter_by_domain
 )
-import asyncio
-import os
-import sys
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Add backend to path
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-
 
 async def test_connection():
     """Test basic Supabase connection"""
@@ -36,28 +35,37 @@ async def test_connection():
         return False
 
 
-async def test_user_operations():
-    """Test user CRUD operations"""
-    print("\n🧪 Testing user operations...")
+TEST_LINK = "https://tiktok.com/@test_user_12345"
+TEST_DOMAIN = "tech-reviews"
 
-    test_link = "https://tiktok.com/@test_user_12345"
 
+async def seed_test_data():
+    """Insert a user, trend, interaction and niche adapter in one RPC"""
+    print("\n🧪 Seeding test data...")
     try:
-        # Insert user
-        print("  → Inserting test user...")
-        user = await insert_user(
-            link=test_link,
-            parsed_niche="Tech Reviews",
-            location="US",
-            followers=5000,
-            engagement_rate=4.2,
-            top_posts=[
-                {"id": "post1", "views": 10000, "likes": 500},
-                {"id": "post2", "views": 15000, "likes": 750}
-            ]
+        client = get_supabase()
+        response = await asyncio.to_thread(
+            lambda: client.rpc('seed_test_data', {
+                'p_link': TEST_LINK,
+                'p_domain': TEST_DOMAIN
+            }).execute()
         )
-        print(f"  ✅ User inserted: {user.get('id')}")
+        ids = response.data
+        print(f"  ✅ Seeded user {ids['user_id']}, trend {ids['trend_id']}, "
+              f"interaction {ids['interaction_id']}, adapter {ids['adapter_id']}")
+        return ids
+    except Exception as e:
+        print(f"  ❌ Seeding test data failed: {e}")
+        return None
+
+
+async def test_user_operations():
+    """Test user lookup"""
+    print("\n🧪 Testing user operations...")
 
+    test_link = TEST_LINK
+
+    try:
         # Get user by link
         print("  → Fetching user by link...")
         fetched_user = await get_user_by_link(test_link)
@@ -67,86 +75,51 @@ async def test_user_operations():
             print("  ❌ User not found")
             return False
 
-        return user
+        return True
     except Exception as e:
         print(f"  ❌ User operations failed: {e}")
-        return None
+        return False
 
 
 async def test_trend_operations(user_id: str):
-    """Test trend CRUD operations"""
+    """Test trend lookup"""
     print("\n🧪 Testing trend operations...")
 
     try:
-        # Insert trend
-        print("  → Inserting test trend...")
-        trend = await insert_trend(
-            user_id=user_id,
-            trend_title="AI Content Creation",
-            platform="tiktok",
-            video_url="https://tiktok.com/@test/video/123",
-            stat_metrics={
-                "views": 50000,
-                "likes": 2500,
-                "comments": 150,
-                "shares": 80
-            },
-            relevance_score=8.5
-        )
-        print(f"  ✅ Trend inserted: {trend.get('id')}")
-
         # Get trends for user
         print("  → Fetching trends for user...")
         trends = await get_trends_by_user(user_id, limit=10)
         print(f"  ✅ Found {len(trends)} trends")
 
-        return trend
+        return bool(trends)
     except Exception as e:
         print(f"  ❌ Trend operations failed: {e}")
-        return None
+        return False
 
 
-async def test_interaction_operations(user_id: str, trend_id: str):
-    """Test interaction logging"""
+async def test_interaction_operations(user_id: str):
+    """Test interaction lookup"""
     print("\n🧪 Testing interaction operations...")
 
     try:
-        # Log interaction
-        print("  → Logging interaction...")
-        interaction = await insert_interaction(
-            user_id=user_id,
-            trend_id=trend_id,
-            action_type="watched"
-        )
-        print(f"  ✅ Interaction logged: {interaction.get('id')}")
-
         # Get user interactions
         print("  → Fetching user interactions...")
         interactions = await get_user_interactions(user_id, limit=10)
         print(f"  ✅ Found {len(interactions)} interactions")
 
-        return True
+        return bool(interactions)
     except Exception as e:
         print(f"  ❌ Interaction operations failed: {e}")
         return False
 
 
 async def test_niche_adapter_operations():
-    """Test niche adapter operations"""
+    """Test niche adapter lookup"""
     print("\n🧪 Testing niche adapter operations...")
 
-    test_domain = "tech-reviews"
+    test_domain = TEST_DOMAIN
 
     try:
-        # Insert niche adapter
-        print("  → Inserting niche adapter...")
-        adapter = await insert_niche_adapter(
-            domain=test_domain,
-            parsed_by_gpt_summary="Technology product reviews and comparisons",
-            topic_tags=["tech", "reviews", "gadgets", "electronics"]
-        )
-        print(f"  ✅ Niche adapter inserted: {adapter.get('id')}")
-
         # Get niche adapter
         print("  → Fetching niche adapter...")
         fetched_adapter = await get_niche_adapter_by_domain(test_domain)
@@ -173,7 +146,7 @@ async def cleanup_test_data():
         await asyncio.to_thread(
             lambda: client.table("users")
             .delete()
-            .eq("link", "https://tiktok.com/@test_user_12345")
+            .eq("link", TEST_LINK)
             .execute()
         )
 
@@ -181,7 +154,7 @@ async def cleanup_test_data():
         await asyncio.to_thread(
             lambda: client.table("niche_adapters")
             .delete()
-            .eq("domain", "tech-reviews")
+            .eq("domain", TEST_DOMAIN)
             .execute()
         )
 
@@ -201,24 +174,26 @@ async def main():
         print("\n❌ Connection test failed. Please check your configuration.")
         return
 
+    # Seed all test rows in one round trip (see seed_test_data in supabase_migration.sql)
+    ids = await seed_test_data()
+    if not ids:
+        print("\n❌ Seeding test data failed.")
+        return
+
+    user_id = ids['user_id']
+
     # Test 2: User operations
-    user = await test_user_operations()
-    if not user:
+    if not await test_user_operations():
         print("\n❌ User operations failed.")
         return
 
-    user_id = user.get('id')
-
     # Test 3: Trend operations
-    trend = await test_trend_operations(user_id)
-    if not trend:
+    if not await test_trend_operations(user_id):
         print("\n❌ Trend operations failed.")
         return
 
-    trend_id = trend.get('id')
-
     # Test 4: Interaction operations
-    if not await test_interaction_operations(user_id, trend_id):
+    if not await test_interaction_operations(user_id):
         print("\n❌ Interaction operations failed.")
         return
 
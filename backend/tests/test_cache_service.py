@@ -0,0 +1,69 @@
+"""
+Tests for the Redis-backed cache service
+"""
+import asyncio
+import os
+
+import fakeredis
+import pytest
+
+from services.cache_service import CacheService
+
+# Number of simulated requests racing for the same lock; at least two, or
+# nobody is ever refused
+CONCURRENCY = max(2, int(os.getenv("CONCURRENCY", "16")))
+
+
+@pytest.fixture
+def cache_service():
+    """Cache service backed by an in-process fake Redis"""
+    return CacheService(fakeredis.FakeRedis(decode_responses=True))
+
+
+@pytest.mark.asyncio
+async def test_cache_lock(cache_service):
+    """A held lock blocks others and only its owner can release it"""
+    async with cache_service.lock("test:lock", timeout=5) as token:
+        assert token is not None
+        assert await cache_service.acquire_lock("test:lock", timeout=5) is None
+        assert not await cache_service.release_lock("test:lock", "not-the-owner")
+
+    # Released on exit: the old token no longer owns it and it can be retaken
+    assert not await cache_service.release_lock("test:lock", token)
+    async with cache_service.lock("test:lock", timeout=5) as token:
+        assert token is not None
+
+
+@pytest.mark.asyncio
+async def test_lock_released_on_error(cache_service):
+    """An exception inside the block still releases the lock"""
+    with pytest.raises(RuntimeError):
+        async with cache_service.lock("test:lock", timeout=5):
+            raise RuntimeError("boom")
+
+    assert await cache_service.acquire_lock("test:lock", timeout=5) is not None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests(cache_service):
+    """Requests arriving while the lock is held are refused"""
+    start = asyncio.Event()
+    denied = asyncio.Event()
+
+    async def request_simulation() -> bool:
+        # Line every request up so they all hit the lock together
+        await start.wait()
+        async with cache_service.lock("test:concurrent", timeout=5) as token:
+            if token is None:
+                denied.set()
+                return False
+            # Hold the lock until another request has been turned away
+            await asyncio.wait_for(denied.wait(), timeout=1)
+            return True
+
+    tasks = [asyncio.create_task(request_simulation()) for _ in range(CONCURRENCY)]
+    await asyncio.sleep(0)
+    start.set()
+    results = await asyncio.gather(*tasks)
+
+    assert results.count(True) == 1
@@ -0,0 +1,202 @@
+"""
+Tests for utility helpers
+"""
+import pytest
+
+from utils import async_ttl_cache, default_retry_condition, retry_with_backoff
+
+
+@pytest.mark.asyncio
+async def test_retry_with_backoff_calls_factory_each_attempt():
+    """Each retry awaits a fresh coroutine from the factory"""
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("timeout")
+        return "ok"
+
+    result = await retry_with_backoff(lambda: flaky(), max_retries=3, base_delay=0)
+
+    assert result == "ok"
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_retry_with_backoff_supports_sync_callables():
+    """Plain return values are passed through"""
+    assert await retry_with_backoff(lambda: 42, base_delay=0) == 42
+
+
+@pytest.mark.asyncio
+async def test_retry_with_backoff_stops_on_non_retryable_error():
+    """retry_condition returning False re-raises immediately"""
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        await retry_with_backoff(fail, base_delay=0, retry_condition=lambda e: False)
+
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_with_backoff_rejects_coroutine_object():
+    """A coroutine object can't be re-awaited, so it is rejected up front"""
+    async def call():
+        return 1
+
+    coro = call()
+    with pytest.raises(TypeError):
+        await retry_with_backoff(coro)
+    coro.close()
+
+
+@pytest.mark.asyncio
+async def test_retry_with_backoff_caps_and_jitters_delay(monkeypatch):
+    """Delays are capped at max_delay and jittered within +/-50%"""
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr("utils.asyncio.sleep", fake_sleep)
+
+    def fail():
+        raise ConnectionError("timeout")
+
+    with pytest.raises(ConnectionError):
+        await retry_with_backoff(fail, max_retries=4, base_delay=10, max_delay=15)
+
+    assert len(delays) == 4
+    assert 5 <= delays[0] <= 15
+    assert all(7.5 <= d <= 22.5 for d in delays[1:])
+
+
+class _HTTPError(Exception):
+    def __init__(self, status_code, message=""):
+        super().__init__(message)
+        self.response = type("Response", (), {"status_code": status_code})()
+
+
+def test_default_retry_condition_retries_on_status_code():
+    """Server errors and rate limits are retried whatever the message"""
+    assert default_retry_condition(_HTTPError(503))
+    assert default_retry_condition(_HTTPError(429))
+    assert not default_retry_condition(_HTTPError(400, "invalid api key"))
+
+
+def test_default_retry_condition_checks_message_of_other_statuses():
+    """Other status codes still fall through to the message scan"""
+    assert default_retry_condition(_HTTPError(400, "request timed out upstream"))
+    assert default_retry_condition(_HTTPError(500, "connection reset by peer"))
+
+
+def test_default_retry_condition_falls_back_to_message():
+    """Plain exceptions are matched on transient markers"""
+    assert default_retry_condition(Exception("Read Timed Out"))
+    assert default_retry_condition(Exception("upstream returned 502"))
+    assert not default_retry_condition(Exception("invalid api key"))
+
+
+class _Clock:
+    """Stand-in for time.monotonic that only moves when told to"""
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _counted(ttl_seconds, maxsize=1024):
+    """A cached async function plus the list of keys it was really called with"""
+    calls = []
+
+    @async_ttl_cache(ttl_seconds, maxsize=maxsize)
+    async def lookup(key):
+        calls.append(key)
+        return f"value:{key}"
+
+    return lookup, calls
+
+
+@pytest.mark.asyncio
+async def test_async_ttl_cache_returns_cached_result():
+    """Repeat calls with the same arguments hit the cache"""
+    lookup, calls = _counted(60)
+
+    assert await lookup("a") == "value:a"
+    assert await lookup("a") == "value:a"
+    assert await lookup("b") == "value:b"
+
+    assert calls == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_async_ttl_cache_expires_after_ttl(monkeypatch):
+    """An entry older than the TTL is fetched again"""
+    clock = _Clock()
+    monkeypatch.setattr("utils.time.monotonic", clock)
+    lookup, calls = _counted(5)
+
+    await lookup("a")
+    clock.now += 4.9
+    await lookup("a")
+    clock.now += 0.2
+    await lookup("a")
+
+    assert calls == ["a", "a"]
+
+
+@pytest.mark.asyncio
+async def test_async_ttl_cache_resets_when_full():
+    """Reaching maxsize drops the old entries"""
+    lookup, calls = _counted(60, maxsize=2)
+
+    await lookup("a")
+    await lookup("b")
+    await lookup("c")  # cache was full: reset, then holds only "c"
+    await lookup("c")
+    await lookup("a")
+
+    assert calls == ["a", "b", "c", "a"]
+
+
+@pytest.mark.asyncio
+async def test_async_ttl_cache_invalidate_and_clear():
+    """invalidate drops one entry, cache_clear drops all"""
+    lookup, calls = _counted(60)
+
+    await lookup("a")
+    await lookup("b")
+    lookup.invalidate("a")
+    await lookup("a")
+    await lookup("b")
+    assert calls == ["a", "b", "a"]
+
+    lookup.cache_clear()
+    await lookup("b")
+    assert calls == ["a", "b", "a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_async_ttl_cache_does_not_cache_errors():
+    """A failed call is retried on the next call instead of being memoized"""
+    calls = []
+
+    @async_ttl_cache(60)
+    async def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ConnectionError("database unavailable")
+        return "ok"
+
+    with pytest.raises(ConnectionError):
+        await flaky()
+    assert await flaky() == "ok"
+    assert await flaky() == "ok"
+    assert len(calls) == 2
@@ -3,13 +3,31 @@ Utility functions for TrendXL 2.0 Backend
 """
 import re
 import time
+import uuid
 import asyncio
 import logging
-from typing import List, Optional, Callable, Any
+import functools
+import inspect
+import random
+from typing import List, Optional, Callable, Any, Awaitable, Union
 from urllib.parse import urlparse
 
 logger = logging.getLogger(__name__)
 
+# Precompiled patterns for the per-post/per-request helpers below
+_USERNAME_INVALID_CHARS_RE = re.compile(r'[^a-zA-Z0-9._]')
+_HASHTAG_RE = re.compile(r'#[\w\u4e00-\u9fff]+', re.IGNORECASE)
+_HASHTAG_VALID_RE = re.compile(r'^[\w\u4e00-\u9fff]+$')
+# Transient error markers for SDKs that only raise plain Exceptions
+_TRANSIENT_RE = re.compile(
+    r'rate limit|too many requests|temporarily unavailable|timeout|timed out'
+    r'|connection reset|connection aborted|50[234]',
+    re.IGNORECASE
+)
+
+_RETRY_STATUS_CODES = frozenset((429, 502, 503, 504))
+_RETRY_ERROR_CODES = frozenset(('ECONNRESET', 'ETIMEDOUT', 'ECONNREFUSED'))
+
 def extract_tiktok_username(profile_input: str) -> str:
     """
     Extract TikTok username from URL or username string
@@ -38,7 +56,7 @@ def extract_tiktok_username(profile_input: str) -> str:
         username = profile_input.lstrip('@')
     
     # Clean username (remove any remaining special characters)
-    username = re.sub(r'[^a-zA-Z0-9._]', '', username)
+    username = _USERNAME_INVALID_CHARS_RE.sub('', username)
     
     if not username:
         raise ValueError("Invalid TikTok username or URL")
@@ -58,37 +76,41 @@ def extract_hashtags_from_text(text: str) -> List[str]:
     if not text:
         return []
     
-    # Regex pattern to match hashtags (supports Unicode characters)
-    hashtag_regex = r'#[\w\u4e00-\u9fff]+'
-    matches = re.findall(hashtag_regex, text, re.IGNORECASE)
+    # Match hashtags (supports Unicode characters)
+    matches = _HASHTAG_RE.findall(text)
     
     # Clean and lowercase hashtags
     hashtags = [tag[1:].lower() for tag in matches if len(tag) > 1]
     
-    # Remove duplicates while preserving order
-    unique_hashtags = []
-    for hashtag in hashtags:
-        if hashtag not in unique_hashtags:
-            unique_hashtags.append(hashtag)
-    
-    return unique_hashtags
+    # Remove duplicates while preserving order (dicts keep insertion order)
+    return list(dict.fromkeys(hashtags))
 
 async def retry_with_backoff(
-    func: Callable[[], Any],
-    max_retries: int = 3,
+    func: Callable[[], Union[Awaitable[Any], Any]],
+    max_retries: int = 2,
     base_delay: float = 1.0,
     exponential_base: float = 2.0,
-    retry_condition: Optional[Callable[[Exception], bool]] = None
+    retry_condition: Optional[Callable[[Exception], bool]] = None,
+    max_delay: float = 30.0
 ) -> Any:
     """
     Retry function with exponential backoff
     
+    ``func`` must be a factory (e.g. ``lambda: client.call(...)``) that is
+    invoked again on every attempt - not a coroutine object, which can only
+    be awaited once.
+    
+    Delays grow exponentially up to ``max_delay`` and are jittered by
+    +/-50% so that many clients failing together don't retry in lockstep.
+    
     Args:
-        func: Async function to retry
-        max_retries: Maximum number of retry attempts
+        func: Zero-argument callable returning a result or an awaitable
+        max_retries: Maximum number of retry attempts (keep it low on
+            user-facing paths; background jobs can pass a higher value)
         base_delay: Base delay in seconds
         exponential_base: Base for exponential backoff
         retry_condition: Function to determine if error should trigger retry
+        max_delay: Upper bound for the delay before jitter, in seconds
         
     Returns:
         Result from successful function call
@@ -96,13 +118,20 @@ async def retry_with_backoff(
     Raises:
         Last exception if all retries fail
     """
+    if not callable(func):
+        raise TypeError(
+            "retry_with_backoff expects a callable that creates a new call per attempt, "
+            f"got {type(func).__name__}"
+        )
+    
     last_exception = None
     
     for attempt in range(max_retries + 1):
         try:
+            # Fresh call (and fresh coroutine) on every attempt
             result = func()
             # Support both sync and async callables
-            if asyncio.iscoroutine(result):
+            if inspect.isawaitable(result):
                 return await result
             return result
         except Exception as e:
@@ -114,13 +143,58 @@ async def retry_with_backoff(
             
             # Don't wait after the last attempt
             if attempt < max_retries:
-                delay = base_delay * (exponential_base ** attempt)
+                delay = min(max_delay, base_delay * (exponential_base ** attempt))
+                delay *= 0.5 + random.random()
                 logger.warning(f"Attempt {attempt + 1} failed, retrying in {delay:.2f}s: {e}")
                 await asyncio.sleep(delay)
     
     # All retries exhausted
     raise last_exception
 
+def async_ttl_cache(ttl_seconds: float, maxsize: int = 1024):
+    """
+    Cache results of an async function for a short time, keyed by its arguments
+
+    Meant for read-mostly lookups that get polled repeatedly (e.g. free trial
+    status). Exceptions propagate and are not cached, so functions that fall
+    back to a default on errors should do that outside the cached function.
+    The decorated function gets ``invalidate(*args, **kwargs)`` to drop one
+    entry after a write, and ``cache_clear()``.
+
+    Args:
+        ttl_seconds: How long a result stays valid
+        maxsize: Entries kept before the cache is reset
+
+    Returns:
+        Decorator for async functions with hashable arguments
+    """
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        cache: dict = {}
+
+        def make_key(args: tuple, kwargs: dict) -> tuple:
+            return args + tuple(sorted(kwargs.items())) if kwargs else args
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs)
+            now = time.monotonic()
+            entry = cache.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+
+            result = await func(*args, **kwargs)
+            if len(cache) >= maxsize:
+                cache.clear()
+            cache[key] = (now + ttl_seconds, result)
+            return result
+
+        wrapper.invalidate = lambda *args, **kwargs: cache.pop(
+            make_key(args, kwargs), None)
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
+
 def default_retry_condition(error: Exception) -> bool:
     """
     Default retry condition for API requests
@@ -131,26 +205,18 @@ def default_retry_condition(error: Exception) -> bool:
     Returns:
         True if should retry, False otherwise
     """
-    # Retry on specific HTTP status codes and network errors
-    if hasattr(error, 'response') and hasattr(error.response, 'status_code'):
-        status = error.response.status_code
-        # Retry on server errors and rate limits
-        if status in [429, 502, 503, 504]:
-            return True
+    # Retry on server errors and rate limits
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    if status in _RETRY_STATUS_CODES:
+        return True
     
     # Retry on connection errors
-    if hasattr(error, 'code'):
-        if error.code in ['ECONNRESET', 'ETIMEDOUT', 'ECONNREFUSED']:
-            return True
+    code = getattr(error, 'code', None)
+    if isinstance(code, str) and code in _RETRY_ERROR_CODES:
+        return True
     
     # Fallback: retry based on error message content (some SDKs raise plain Exceptions)
-    err = str(error).lower()
-    transient_markers = [
-        'rate limit', 'too many requests', 'temporarily unavailable',
-        'timeout', 'timed out', 'connection reset', 'connection aborted',
-        '502', '503', '504'
-    ]
-    return any(marker in err for marker in transient_markers)
+    return _TRANSIENT_RE.search(str(error)) is not None
 
 def validate_hashtag(hashtag: str) -> str:
     """
@@ -172,7 +238,7 @@ def validate_hashtag(hashtag: str) -> str:
     clean_hashtag = hashtag.lstrip('#').strip()
     
     # Validate hashtag format
-    if not re.match(r'^[\w\u4e00-\u9fff]+$', clean_hashtag):
+    if not _HASHTAG_VALID_RE.match(clean_hashtag):
         raise ValueError("Invalid hashtag format")
     
     return clean_hashtag.lower()
@@ -196,14 +262,41 @@ def format_number(num: int) -> str:
     else:
         return str(num)
 
+# (unix second, formatted timestamp) of the last get_current_timestamp() call
+_timestamp_cache = (-1, '')
+
 def get_current_timestamp() -> str:
     """
     Get current timestamp in ISO format
     
+    The value only changes once per second, so the formatted string is
+    reused for calls within the same second.
+    
     Returns:
         ISO formatted timestamp string
     """
-    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    global _timestamp_cache
+    now = int(time.time())
+    second, formatted = _timestamp_cache
+    if second != now:
+        formatted = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(now))
+        _timestamp_cache = (now, formatted)
+    return formatted
+
+SECONDS_PER_DAY = 86400
+
+def seconds_until_utc_midnight() -> int:
+    """
+    Get seconds left until the next UTC midnight
+
+    Returns:
+        Seconds until the current UTC day ends (1..86400)
+    """
+    # Unix time has no leap seconds, so every UTC day is exactly 86400s
+    return SECONDS_PER_DAY - int(time.time()) % SECONDS_PER_DAY
+
+# Sentinel for "key absent" (a stored None is a real value)
+_MISSING = object()
 
 def safe_get_nested(data: dict, keys: List[str], default: Any = None) -> Any:
     """
@@ -219,23 +312,61 @@ def safe_get_nested(data: dict, keys: List[str], default: Any = None) -> Any:
     """
     current = data
     for key in keys:
-        if isinstance(current, dict) and key in current:
-            current = current[key]
-        else:
+        if not isinstance(current, dict):
+            return default
+        current = current.get(key, _MISSING)
+        if current is _MISSING:
             return default
     return current
 
+# Sliding window check in one round trip: drop expired entries, count,
+# record the request if under the limit. Returns 1 if allowed, 0 otherwise.
+_RATE_LIMIT_LUA = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+if redis.call('ZCARD', key) < tonumber(ARGV[3]) then
+    redis.call('ZADD', key, now, ARGV[4])
+    redis.call('EXPIRE', key, math.ceil(window))
+    return 1
+end
+return 0
+"""
+
 class RateLimiter:
-    """Simple in-memory rate limiter"""
+    """
+    Sliding window rate limiter
+
+    Uses Redis when a client is given, so limits are shared by every worker
+    and serverless instance; otherwise (or if Redis fails) falls back to
+    per-process memory.
+    """
     
-    def __init__(self, max_requests: int, window_seconds: int = 60):
+    def __init__(self, max_requests: int, window_seconds: int = 60, redis_client: Any = None):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
         self.requests = {}
+        self.redis_client = redis_client
+        self._script = redis_client.register_script(_RATE_LIMIT_LUA) if redis_client else None
+    
+    def _redis_key(self, key: str) -> str:
+        return f"trendxl:v2:ratelimit:{key}"
     
     def is_allowed(self, key: str) -> bool:
         """Check if request is allowed for given key"""
         now = time.time()
+        
+        if self._script is not None:
+            try:
+                allowed = self._script(
+                    keys=[self._redis_key(key)],
+                    args=[now, self.window_seconds, self.max_requests, f"{now}:{uuid.uuid4().hex}"]
+                )
+                return bool(allowed)
+            except Exception as e:
+                logger.warning(f"Redis rate limit check failed, using in-memory limiter: {e}")
+        
         window_start = now - self.window_seconds
         
         # Clean old requests
@@ -253,6 +384,16 @@ class RateLimiter:
     
     def get_reset_time(self, key: str) -> int:
         """Get time until rate limit resets"""
+        if self.redis_client is not None:
+            try:
+                oldest = self.redis_client.zrange(self._redis_key(key), 0, 0, withscores=True)
+                if not oldest:
+                    return 0
+                reset_time = oldest[0][1] + self.window_seconds
+                return max(0, int(reset_time - time.time()))
+            except Exception as e:
+                logger.warning(f"Redis rate limit reset lookup failed: {e}")
+        
         if key not in self.requests or not self.requests[key]:
             return 0
         
@@ -1,9 +1,9 @@
 """
 Vercel Adapter for FastAPI Application
-Handles the conversion between Vercel's serverless format and FastAPI
+Vercel's Python runtime serves ASGI apps natively, so the FastAPI app is
+exported as-is - no Mangum translation layer per invocation.
 """
-from mangum import Mangum
 from main import app
 
-# Create Mangum handler for Vercel
-handler = Mangum(app, lifespan="off")
+# Kept for entry points that still look up `handler`
+handler = app
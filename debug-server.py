@@ -3,114 +3,237 @@
 Simple debug server to provide backend status information
 Runs on port 9999 to not conflict with main backend
 """
+import os
+import re
 import subprocess
 import socket
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import json
 import datetime
 import threading
 import time
+from urllib.parse import parse_qs, urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+PROBE_TIMEOUT = 5
+# Dashboards poll /debug-status; serve the same report for this long (?fresh=1 bypasses)
+STATUS_CACHE_TTL = 2.0
+
+
+BACKEND_PORT = 8000
+TCP_LISTEN = '0A'
+_PROC_RE = re.compile(rb'(?i)python|uvicorn|fastapi')
+# Log tails read at most this much from the end of the file
+TAIL_CHUNK_SIZE = 8192
+TAIL_MAX_BYTES = 1024 * 1024
+
+
+def _decode_proc_addr(addr):
+    """'0100007F:1F40' from /proc/net/tcp -> '127.0.0.1:8000'"""
+    host, port = addr.split(':')
+    if len(host) == 8:
+        ip = socket.inet_ntop(socket.AF_INET, bytes.fromhex(host)[::-1])
+    else:
+        # IPv6: four little-endian 32-bit words
+        raw = b''.join(bytes.fromhex(host[i:i + 8])[::-1] for i in range(0, 32, 8))
+        ip = f"[{socket.inet_ntop(socket.AF_INET6, raw)}]"
+    return f"{ip}:{int(port, 16)}"
+
+
+def _find_port_listeners(port=BACKEND_PORT):
+    """Listening sockets on port, read straight from /proc/net/tcp{,6}"""
+    suffix = f':{port:04X}'
+    listeners = []
+    for proto in ('tcp', 'tcp6'):
+        try:
+            with open(f'/proc/net/{proto}') as f:
+                next(f)  # header
+                for line in f:
+                    fields = line.split()
+                    if fields[1].endswith(suffix) and fields[3] == TCP_LISTEN:
+                        listeners.append(f"{proto:<5} {_decode_proc_addr(fields[1])} LISTEN")
+        except FileNotFoundError:
+            continue
+    return listeners
+
+
+def _find_python_procs():
+    """'pid cmdline' for every python/uvicorn/fastapi process, from /proc/*/cmdline"""
+    procs = []
+    with os.scandir('/proc') as entries:
+        for entry in entries:
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry.name}/cmdline', 'rb') as f:
+                    cmdline = f.read()
+            except OSError:
+                # Process exited while scanning
+                continue
+            # Match on raw bytes; only decode the processes we report
+            if _PROC_RE.search(cmdline) and b'grep' not in cmdline:
+                cmdline = cmdline.replace(b'\0', b' ').strip().decode('utf-8', 'replace')
+                procs.append(f"{entry.name:>7} {cmdline}")
+    return procs
+
+
+def _tail(path, n=10, chunk_size=TAIL_CHUNK_SIZE, max_bytes=TAIL_MAX_BYTES):
+    """Last n lines of a file (as bytes): pread a window off the end, doubling it until it holds n lines"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        window = min(chunk_size, size)
+        while True:
+            data = os.pread(fd, window, size - window)
+            if data.count(b'\n') > n or window >= size or window >= max_bytes:
+                break
+            window = min(window * 2, size, max_bytes)
+    finally:
+        os.close(fd)
+    return data.splitlines()[-n:]
+
+
+def _join_lines(lines):
+    """Join probe output lines (bytes passed through as-is, str encoded)"""
+    return b'\n'.join(line if isinstance(line, bytes) else line.encode('utf-8') for line in lines)
+
+
+def _probe_port():
+    """Check port 8000"""
+    try:
+        return _find_port_listeners() or ["❌ Nothing listening on port 8000"]
+    except Exception as e:
+        return [f"❌ Failed to check port: {e}"]
+
+
+def _probe_python_processes():
+    """Check Python processes"""
+    try:
+        return _find_python_procs() or ["❌ No Python processes found"]
+    except Exception as e:
+        return [f"❌ Failed to check processes: {e}"]
+
+
+def _probe_supervisor():
+    """Check supervisor status"""
+    try:
+        result = subprocess.run([
+            'supervisorctl', '-c', '/etc/supervisor/conf.d/supervisord.conf', 'status'
+        ], capture_output=True, timeout=PROBE_TIMEOUT)
+        
+        if result.returncode == 0:
+            # Raw bytes straight into the report, no decode/re-encode
+            return result.stdout.strip().splitlines()
+        return [f"❌ Supervisor error: {result.stderr.decode('utf-8', 'replace').strip()}"]
+    except Exception as e:
+        return [f"❌ Failed to get supervisor status: {e}"]
+
+
+def _probe_log(path, missing, failed):
+    """Last 10 lines of a supervisor log"""
+    try:
+        lines = _tail(path)
+    except FileNotFoundError:
+        return [missing]
+    except Exception as e:
+        return [f"{failed}: {e}"]
+    return lines if any(line.strip() for line in lines) else [missing]
+
+
+def _probe_backend_log():
+    """Backend logs"""
+    return _probe_log('/var/log/supervisor/backend.log',
+                      "❌ No backend stdout log available", "❌ Failed to read backend log")
+
+
+def _probe_backend_error_log():
+    """Backend error logs"""
+    return _probe_log('/var/log/supervisor/backend_error.log',
+                      "❌ No backend error log available", "❌ Failed to read backend error log")
+
+
+# Status sections in report order: (encoded header, probe returning its lines)
+PROBES = (
+    (b"\n=== PORT 8000 STATUS ===\n", _probe_port),
+    (b"\n=== PYTHON PROCESSES ===\n", _probe_python_processes),
+    (b"\n=== SUPERVISOR STATUS ===\n", _probe_supervisor),
+    (b"\n=== BACKEND LOGS (last 10 lines) ===\n", _probe_backend_log),
+    (b"\n=== BACKEND ERRORS (last 10 lines) ===\n", _probe_backend_error_log),
+)
+_REPORT_HEADER = b"=== BACKEND DEBUG STATUS ===\nTimestamp: "
+_CHUNKED_END = b'0\r\n\r\n'
+# Fixed reply for unknown paths, written in one go
+_NOT_FOUND = b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n'
 
 class DebugHandler(BaseHTTPRequestHandler):
+    # Chunked transfer encoding needs HTTP/1.1
+    protocol_version = 'HTTP/1.1'
+    # Buffer the response instead of one send() per write: headers go out
+    # together with the first section, and the handler flushes the rest
+    wbufsize = -1
+    # Last encoded status report, shared by all requests (see write_status)
+    _cache = {'ts': 0.0, 'body': b''}
+    _cache_lock = threading.Lock()
+
     def do_GET(self):
-        if self.path == '/debug-status':
+        url = urlparse(self.path)
+        if url.path == '/debug-status':
+            fresh = parse_qs(url.query).get('fresh') == ['1']
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; charset=utf-8')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
             try:
-                status = self.get_backend_status()
-                self.send_response(200)
-                self.send_header('Content-Type', 'text/plain')
-                self.end_headers()
-                self.wfile.write(status.encode('utf-8'))
+                self.write_status(fresh=fresh)
             except Exception as e:
-                self.send_response(500)
-                self.send_header('Content-Type', 'text/plain')
-                self.end_headers()
-                self.wfile.write(f"Error getting backend status: {e}".encode('utf-8'))
+                self._emit(f"\nError getting backend status: {e}\n".encode('utf-8'))
+            self.wfile.write(_CHUNKED_END)
         else:
-            self.send_response(404)
-            self.end_headers()
+            self.wfile.write(_NOT_FOUND)
     
-    def get_backend_status(self):
-        """Collect comprehensive backend status"""
-        status_lines = []
-        status_lines.append("=== BACKEND DEBUG STATUS ===")
-        status_lines.append(f"Timestamp: {datetime.datetime.now().isoformat()}")
-        status_lines.append("")
-        
-        # Check port 8000
-        status_lines.append("=== PORT 8000 STATUS ===")
-        try:
-            result = subprocess.run(['netstat', '-tuln'], capture_output=True, text=True, timeout=5)
-            if ':8000' in result.stdout:
-                lines = [line for line in result.stdout.split('\n') if ':8000' in line]
-                status_lines.extend(lines)
-            else:
-                status_lines.append("❌ Nothing listening on port 8000")
-        except Exception as e:
-            status_lines.append(f"❌ Failed to check port: {e}")
-        
-        status_lines.append("")
-        
-        # Check Python processes
-        status_lines.append("=== PYTHON PROCESSES ===")
-        try:
-            result = subprocess.run(['ps', 'aux'], capture_output=True, text=True, timeout=5)
-            python_lines = []
-            for line in result.stdout.split('\n'):
-                if any(term in line.lower() for term in ['python', 'uvicorn', 'fastapi']) and 'grep' not in line:
-                    python_lines.append(line)
-            
-            if python_lines:
-                status_lines.extend(python_lines)
-            else:
-                status_lines.append("❌ No Python processes found")
-        except Exception as e:
-            status_lines.append(f"❌ Failed to check processes: {e}")
-        
-        status_lines.append("")
-        
-        # Check supervisor status
-        status_lines.append("=== SUPERVISOR STATUS ===")
-        try:
-            result = subprocess.run([
-                'supervisorctl', '-c', '/etc/supervisor/conf.d/supervisord.conf', 'status'
-            ], capture_output=True, text=True, timeout=5)
-            
-            if result.returncode == 0:
-                status_lines.extend(result.stdout.strip().split('\n'))
-            else:
-                status_lines.append(f"❌ Supervisor error: {result.stderr.strip()}")
-        except Exception as e:
-            status_lines.append(f"❌ Failed to get supervisor status: {e}")
-        
-        status_lines.append("")
-        
-        # Backend logs
-        status_lines.append("=== BACKEND LOGS (last 10 lines) ===")
-        try:
-            result = subprocess.run(['tail', '-10', '/var/log/supervisor/backend.log'], 
-                                  capture_output=True, text=True, timeout=5)
-            if result.returncode == 0 and result.stdout.strip():
-                status_lines.extend(result.stdout.strip().split('\n'))
-            else:
-                status_lines.append("❌ No backend stdout log available")
-        except Exception as e:
-            status_lines.append(f"❌ Failed to read backend log: {e}")
-        
-        status_lines.append("")
+    def _emit(self, chunk):
+        """Write one chunked transfer encoding frame"""
+        if chunk:
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+    
+    def write_status(self, fresh=False):
+        """
+        Write the status report, re-collected at most every STATUS_CACHE_TTL seconds
+
+        A cached report goes out as a single chunk. A new one is streamed
+        section by section as its probes finish and published to the cache
+        afterwards; the lock only guards the cache, never socket writes.
+        """
+        cache = DebugHandler._cache
+        if not fresh and time.monotonic() - cache['ts'] < STATUS_CACHE_TTL:
+            self._emit(cache['body'])
+            return
+        sections = []
+        for section in self.iter_backend_status():
+            sections.append(section)
+            self._emit(section)
+            self.wfile.flush()
+        with DebugHandler._cache_lock:
+            DebugHandler._cache = {'ts': time.monotonic(), 'body': b''.join(sections)}
+    
+    def iter_backend_status(self):
+        """Collect comprehensive backend status, one encoded report section at a time"""
+        yield _REPORT_HEADER + datetime.datetime.now().isoformat().encode() + b'\n'
         
-        # Backend error logs  
-        status_lines.append("=== BACKEND ERRORS (last 10 lines) ===")
+        # Probes are independent: run them side by side, report in order.
+        # Don't wait on shutdown, so a hung probe can't hold the response
+        # past its timeout
+        executor = ThreadPoolExecutor(max_workers=len(PROBES))
         try:
-            result = subprocess.run(['tail', '-10', '/var/log/supervisor/backend_error.log'],
-                                  capture_output=True, text=True, timeout=5)
-            if result.returncode == 0 and result.stdout.strip():
-                status_lines.extend(result.stdout.strip().split('\n'))
-            else:
-                status_lines.append("❌ No backend error log available")
-        except Exception as e:
-            status_lines.append(f"❌ Failed to read backend error log: {e}")
-            
-        return '\n'.join(status_lines)
+            futures = [executor.submit(probe) for _, probe in PROBES]
+            for (header, _), future in zip(PROBES, futures):
+                try:
+                    lines = future.result(timeout=PROBE_TIMEOUT + 1)
+                except Exception as e:
+                    lines = [f"❌ Probe failed: {e}"]
+                yield header + _join_lines(lines) + b'\n'
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
     
     def log_message(self, format, *args):
         # Suppress default logging
@@ -119,7 +242,9 @@ class DebugHandler(BaseHTTPRequestHandler):
 def start_debug_server():
     """Start debug server on port 9999"""
     try:
-        server = HTTPServer(('127.0.0.1', 9999), DebugHandler)
+        server = ThreadingHTTPServer(('127.0.0.1', 9999), DebugHandler)
+        # Don't let in-flight probes block shutdown
+        server.daemon_threads = True
         print("Debug server starting on port 9999...")
         server.serve_forever()
     except Exception as e:
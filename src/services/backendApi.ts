@@ -601,11 +601,14 @@ export async function getTokenUsageSummary(authToken: string): Promise<any> {
 
 /**
  * Get detailed token usage history for the current user
+ *
+ * Pass the returned `next_cursor` back as `cursor` to fetch the next page;
+ * it is an opaque string (timestamp and record id) and is null on the last page.
  */
 export async function getTokenUsageHistory(
   authToken: string,
   limit: number = 50,
-  offset: number = 0
+  cursor?: string | null
 ): Promise<any> {
   try {
     const client = createBackendClient();
@@ -615,7 +618,7 @@ export async function getTokenUsageHistory(
       },
       params: {
         limit,
-        offset
+        ...(cursor ? { cursor } : {})
       }
     });
     
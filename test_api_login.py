@@ -16,31 +16,30 @@ async def test_login_api():
     print(f"API URL: {API_URL}")
     print("="*60)
 
-    # Test 1: Check if API is alive
-    print("\n1️⃣ Testing API health...")
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{API_URL}/health", timeout=10.0)
+    # One client for all probes so they share a single connection
+    async with httpx.AsyncClient(base_url=API_URL, timeout=10.0) as client:
+        # Test 1: Check if API is alive
+        print("\n1️⃣ Testing API health...")
+        try:
+            response = await client.get("/health")
             print(f"   Status: {response.status_code}")
             print(f"   Response: {response.text[:200]}")
-    except Exception as e:
-        print(f"   ❌ Error: {e}")
+        except Exception as e:
+            print(f"   ❌ Error: {e}")
 
-    # Test 2: Try login with the problematic account
-    print("\n2️⃣ Testing Login endpoint...")
-    email = "s.kamaliev@generaition.org"
-    # NOTE: Replace with actual password for testing
-    password = "test123456"  # This is probably wrong, but let's see the error
+        # Test 2: Try login with the problematic account
+        print("\n2️⃣ Testing Login endpoint...")
+        email = "s.kamaliev@generaition.org"
+        # NOTE: Replace with actual password for testing
+        password = "test123456"  # This is probably wrong, but let's see the error
 
-    try:
-        async with httpx.AsyncClient() as client:
+        try:
             response = await client.post(
-                f"{API_URL}/api/v1/auth/login",
+                "/api/v1/auth/login",
                 json={
                     "email": email,
                     "password": password
-                },
-                timeout=10.0
+                }
             )
 
             print(f"   Status: {response.status_code}")
@@ -58,21 +57,17 @@ async def test_login_api():
                 except:
                     pass
 
-    except Exception as e:
-        print(f"   ❌ Exception: {e}")
+        except Exception as e:
+            print(f"   ❌ Exception: {e}")
 
-    # Test 3: Check if we can access /api/v1/auth/me without token
-    print("\n3️⃣ Testing /me endpoint without auth...")
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{API_URL}/api/v1/auth/me",
-                timeout=10.0
-            )
+        # Test 3: Check if we can access /api/v1/auth/me without token
+        print("\n3️⃣ Testing /me endpoint without auth...")
+        try:
+            response = await client.get("/api/v1/auth/me")
             print(f"   Status: {response.status_code}")
             print(f"   Response: {response.text[:200]}")
-    except Exception as e:
-        print(f"   ❌ Error: {e}")
+        except Exception as e:
+            print(f"   ❌ Error: {e}")
 
     print("\n" + "="*60)
     print("Test complete!")
@@ -2,9 +2,17 @@
 Test script to reproduce login issue using Playwright
 """
 import asyncio
-from playwright.async_api import async_playwright
+import os
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError, async_playwright
 import json
 
+# Prefer uvloop when it is installed
+try:
+    from uvloop import run as run_async
+except ImportError:
+    from asyncio import run as run_async
+
+AUTH_PATH = '/api/v1/auth/'
 
 async def test_login():
     """Test login flow and capture detailed error"""
@@ -14,8 +22,11 @@ async def test_login():
         context = await browser.new_context()
         page = await context.new_page()
 
-        # Enable request/response logging
-        async def log_request(request):
+        # Enable request/response logging for auth API calls only; other
+        # traffic is dropped by a cheap sync check before any coroutine runs
+        def log_request(request):
+            if AUTH_PATH not in request.url:
+                return
             print(f"\n📤 REQUEST: {request.method} {request.url}")
             if request.post_data:
                 try:
@@ -28,16 +39,23 @@ async def test_login():
                     print(f"   Body: {request.post_data[:100]}...")
 
         async def log_response(response):
-            if '/api/v1/auth/' in response.url:
-                print(f"\n📥 RESPONSE: {response.status} {response.url}")
-                try:
-                    body = await response.text()
-                    print(f"   Body: {body[:500]}")
-                except:
-                    pass
+            print(f"\n📥 RESPONSE: {response.status} {response.url}")
+            try:
+                body = await response.text()
+                print(f"   Body: {body[:500]}")
+            except:
+                pass
+
+        pending_logs = set()
+
+        def on_response(response):
+            if AUTH_PATH in response.url:
+                task = asyncio.create_task(log_response(response))
+                pending_logs.add(task)
+                task.add_done_callback(pending_logs.discard)
 
         page.on("request", log_request)
-        page.on("response", log_response)
+        page.on("response", on_response)
 
         # Go to deployed site
         print("🌐 Opening site: https://endxl-2-0-01102025.vercel.app")
@@ -59,42 +77,49 @@ async def test_login():
         # Replace with actual password
         await page.fill('input[type="password"]', 'your_actual_password_here')
 
-        # Click login button
+        # Click login button and wait for the auth call to come back
         print("🔑 Clicking Login button...")
-        await page.click('button:has-text("Login")')
-
-        # Wait for response
-        await page.wait_for_timeout(3000)
+        try:
+            async with page.expect_response(
+                    lambda r: AUTH_PATH in r.url, timeout=15000):
+                await page.click('button:has-text("Login")')
+        except PlaywrightTimeoutError:
+            print("\n⚠️  No auth API response within 15s")
+
+        # Look up every outcome marker in a single round trip, once one shows up
+        outcome = page.locator('text="Ошибка"').or_(
+            page.locator('text="Login failed"')).or_(
+            page.locator('text="Dashboard"')).or_(
+            page.locator('text="Анализ"'))
+        try:
+            await outcome.first.wait_for(timeout=5000)
+        except PlaywrightTimeoutError:
+            pass
+        texts = [text.strip() for text in await outcome.all_text_contents()]
 
         # Check if error message appears
-        error = await page.query_selector('text="Ошибка"')
-        if error:
+        if "Ошибка" in texts:
             print("\n❌ Error detected!")
-            error_text = await error.text_content()
-            print(f"   Error message: {error_text}")
-
-            # Try to get more details
-            error_details = await page.query_selector('text="Login failed"')
-            if error_details:
-                details_text = await error_details.text_content()
-                print(f"   Details: {details_text}")
+            print("   Error message: Ошибка")
+            if "Login failed" in texts:
+                print("   Details: Login failed")
 
         # Check if logged in successfully
-        await page.wait_for_timeout(2000)
-        success = await page.query_selector('text="Dashboard"') or await page.query_selector('text="Анализ"')
-        if success:
+        if "Dashboard" in texts or "Анализ" in texts:
             print("\n✅ Login successful!")
         else:
             print("\n❌ Login failed - still on login page")
 
-        # Keep browser open for manual inspection
-        print("\n⏸️  Press Enter to close browser...")
-        input()
+        # Keep browser open for manual inspection (set KEEP_OPEN=1); the
+        # prompt runs in a thread so page handlers keep being served
+        if os.getenv("KEEP_OPEN"):
+            print("\n⏸️  Press Enter to close browser...")
+            await asyncio.to_thread(input)
 
         await browser.close()
 
 if __name__ == "__main__":
-    asyncio.run(test_login())
+    run_async(test_login())
 
 
 
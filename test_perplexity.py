@@ -2,14 +2,32 @@
 """
 Test Perplexity API connection and functionality
 """
-from config import settings
-from services.perplexity_service import perplexity_service
 import asyncio
 import sys
 import os
 
-# Add backend directory to path
-sys.path.append('backend')
+# Make backend modules importable when run from the repo root
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from config import settings
+from services.perplexity_service import perplexity_service
+
+try:
+    from uvloop import run as run_async
+except ImportError:
+    from asyncio import run as run_async
+
+# Fixed sample profile; with PERPLEXITY_RESPONSE_CACHE on, repeat runs get
+# the niche analysis from cache
+TEST_USERNAME = "testuser"
+TEST_BIO = "Tech enthusiast sharing AI and coding tips"
+TEST_POSTS = (
+    "Just built an amazing AI chatbot using Python!",
+    "Machine learning tips for beginners #AI #Python",
+    "Coding late night again... #developer #programming"
+)
 
 
 async def test_perplexity():
@@ -22,43 +40,40 @@ async def test_perplexity():
     print(f"Model: {settings.perplexity_model}")
     print(f"Key prefix: {settings.perplexity_api_key[:10]}...")
 
-    # Test health check
-    print("\n1️⃣ Testing health check...")
+    # The health check runs while the niche analysis is in flight; the
+    # analysis falls back instead of raising, so health decides the outcome
+    health_task = asyncio.create_task(perplexity_service.health_check())
     try:
-        health_ok = await perplexity_service.health_check()
-        print(f"Health check result: {health_ok}")
+        print("\n1️⃣ Testing niche analysis (health check runs alongside)...")
+        print(f"Analyzing test profile: @{TEST_USERNAME}")
+        print(f"Bio: {TEST_BIO}")
+        print(f"Posts: {len(TEST_POSTS)} sample posts")
+
+        try:
+            result, _ = await perplexity_service.analyze_user_niche(
+                username=TEST_USERNAME,
+                bio=TEST_BIO,
+                recent_posts_content=TEST_POSTS,
+                follower_count=1000,
+                video_count=50
+            )
+        except Exception as e:
+            print(f"❌ Niche analysis error: {e}")
+            print(f"Error type: {type(e).__name__}")
+            return False
+
+        print("\n2️⃣ Health check...")
+        try:
+            health_ok = await health_task
+        except Exception as e:
+            print(f"❌ Health check error: {e}")
+            return False
 
+        print(f"Health check result: {health_ok}")
         if not health_ok:
             print("❌ Health check failed!")
             return False
 
-    except Exception as e:
-        print(f"❌ Health check error: {e}")
-        return False
-
-    # Test niche analysis
-    print("\n2️⃣ Testing niche analysis...")
-    try:
-        test_username = "testuser"
-        test_bio = "Tech enthusiast sharing AI and coding tips"
-        test_posts = [
-            "Just built an amazing AI chatbot using Python!",
-            "Machine learning tips for beginners #AI #Python",
-            "Coding late night again... #developer #programming"
-        ]
-
-        print(f"Analyzing test profile: @{test_username}")
-        print(f"Bio: {test_bio}")
-        print(f"Posts: {len(test_posts)} sample posts")
-
-        result = await perplexity_service.analyze_user_niche(
-            username=test_username,
-            bio=test_bio,
-            recent_posts_content=test_posts,
-            follower_count=1000,
-            video_count=50
-        )
-
         print(f"\n✅ Analysis successful!")
         print(f"Category: {result.niche_category}")
         print(f"Description: {result.niche_description}")
@@ -67,16 +82,13 @@ async def test_perplexity():
 
         return True
 
-    except Exception as e:
-        print(f"❌ Niche analysis error: {e}")
-        print(f"Error type: {type(e).__name__}")
-        return False
-
     finally:
+        if not health_task.done():
+            health_task.cancel()
         await perplexity_service.close()
 
 if __name__ == "__main__":
-    success = asyncio.run(test_perplexity())
+    success = run_async(test_perplexity())
 
     if success:
         print("\n🎉 Perplexity API test PASSED!")